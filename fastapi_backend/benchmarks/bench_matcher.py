@@ -0,0 +1,78 @@
+"""Matcher microbenchmarks against synthetic knowledge bases of increasing size.
+
+    cd fastapi_backend
+    python -m benchmarks.bench_matcher --sizes 100 1000 10000 50000 --output results/matcher.json
+"""
+import argparse
+import time
+
+from benchmarks.stats import run_metadata, summarize, write_results
+from benchmarks.synthetic import make_knowledge_base, make_questions
+
+
+def bench_size(n_faqs: int, n_questions: int, batch_size: int) -> dict:
+    from routers.chat import find_best_answer, find_best_answers
+    from services.knowledge_base import KnowledgeBase
+
+    data = make_knowledge_base(n_faqs)
+    questions = make_questions(data, n_questions)
+
+    start = time.perf_counter()
+    kb = KnowledgeBase(data, f"synthetic-{n_faqs}")
+    build_seconds = time.perf_counter() - start
+
+    # Warm up allocator and caches before timing
+    for question in questions[:50]:
+        find_best_answer(question, None, kb)
+
+    latencies = []
+    paths = {}
+    started = time.perf_counter()
+    for question in questions:
+        t0 = time.perf_counter()
+        result = find_best_answer(question, None, kb)
+        latencies.append(time.perf_counter() - t0)
+        paths[result["match_path"]] = paths.get(result["match_path"], 0) + 1
+    single = summarize(latencies, time.perf_counter() - started)
+
+    batch_latencies = []
+    started = time.perf_counter()
+    for i in range(0, len(questions), batch_size):
+        chunk = questions[i:i + batch_size]
+        t0 = time.perf_counter()
+        find_best_answers(chunk, [None] * len(chunk), kb)
+        batch_latencies.append(time.perf_counter() - t0)
+    batch_elapsed = time.perf_counter() - started
+
+    return {
+        "faqs": n_faqs,
+        "questions": n_questions,
+        "build_ms": round(build_seconds * 1000, 2),
+        "single": single,
+        "batch": {
+            "batch_size": batch_size,
+            "per_batch": summarize(batch_latencies),
+            "questions_per_s": round(len(questions) / batch_elapsed, 2)
+        },
+        "paths": paths
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args(argv)
+
+    results = {
+        "benchmark": "matcher",
+        "meta": run_metadata(),
+        "cases": [bench_size(size, args.questions, args.batch_size) for size in args.sizes]
+    }
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
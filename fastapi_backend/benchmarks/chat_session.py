@@ -0,0 +1,100 @@
+"""Per-turn latency of long chat sessions: POST /chat/ask versus one /chat/ws connection.
+
+    python main.py
+    python -m benchmarks.chat_session --sessions 20 --turns 50 --output results/session.json
+
+Every session asks the same scripted questions (with follow-ups) over both
+transports. HTTP sessions reuse one keep-alive client, as the Streamlit app
+does, so the difference is per-request overhead (headers, routing, body
+validation, conversation lookup) rather than connection setup. Needs the
+`websockets` package, which uvicorn[standard] installs. Start the server
+with RATE_LIMIT_PER_SECOND=0, or long sessions will hit the rate limit.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from benchmarks.load_test import FOLLOW_UPS
+from benchmarks.stats import run_metadata, summarize, write_results
+from benchmarks.synthetic import QUESTION_TEMPLATES
+
+
+def script(turns: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [
+        rng.choice(FOLLOW_UPS) if i and rng.random() < 0.3 else rng.choice(QUESTION_TEMPLATES)
+        for i in range(turns)
+    ]
+
+
+async def http_session(client: httpx.AsyncClient, questions: list, latencies: list, errors: list):
+    conversation_id = None
+    for question in questions:
+        body = {"question": question}
+        if conversation_id:
+            body["conversation_id"] = conversation_id
+        start = time.perf_counter()
+        response = await client.post("/chat/ask", json=body)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+            continue
+        latencies.append(elapsed)
+        conversation_id = response.json()["conversation_id"]
+
+
+async def ws_session(url: str, questions: list, latencies: list, errors: list):
+    import websockets
+
+    async with websockets.connect(url) as socket:
+        for question in questions:
+            start = time.perf_counter()
+            await socket.send(json.dumps({"question": question}))
+            reply = json.loads(await socket.recv())
+            elapsed = time.perf_counter() - start
+            if "error" in reply:
+                errors.append(reply["status"])
+                continue
+            latencies.append(elapsed)
+
+
+async def run(args) -> dict:
+    scripts = [script(args.turns, seed) for seed in range(args.sessions)]
+    ws_url = args.base_url.replace("http", "ws", 1) + "/chat/ws"
+    results = {}
+    for transport in ("http", "ws"):
+        latencies, errors = [], []
+        started = time.perf_counter()
+        if transport == "http":
+            limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+            async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+                await asyncio.gather(*[http_session(client, s, latencies, errors) for s in scripts])
+        else:
+            await asyncio.gather(*[ws_session(ws_url, s, latencies, errors) for s in scripts])
+        results[transport] = summarize(latencies, time.perf_counter() - started, len(errors))
+    return {
+        "benchmark": "session",
+        "meta": run_metadata(),
+        "config": {"base_url": args.base_url, "sessions": args.sessions, "turns": args.turns},
+        "endpoints": results,
+        "overall": results["ws"]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=50, help="questions per session")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args(argv)
+    write_results(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
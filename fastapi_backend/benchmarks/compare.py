@@ -0,0 +1,50 @@
+"""Compare two benchmark result files (matcher or load) and print latency deltas.
+
+    python -m benchmarks.compare results/before.json results/after.json
+"""
+import argparse
+import json
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s")
+
+
+def _cases(results: dict) -> dict:
+    if results["benchmark"] == "matcher":
+        cases = {}
+        for case in results["cases"]:
+            cases[f"faqs={case['faqs']} single"] = case["single"]
+            cases[f"faqs={case['faqs']} batch"] = case["batch"]["per_batch"]
+        return cases
+    cases = {f"endpoint={name}": summary for name, summary in results["endpoints"].items()}
+    cases["overall"] = results["overall"]
+    return cases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if before["benchmark"] != after["benchmark"]:
+        parser.error("results come from different benchmarks")
+
+    old, new = _cases(before), _cases(after)
+    print(f"{'case':<28} {'metric':<18} {'before':>12} {'after':>12} {'change':>9}")
+    for case in old:
+        if case not in new:
+            continue
+        for metric in METRICS:
+            a, b = old[case].get(metric), new[case].get(metric)
+            if a is None or b is None:
+                continue
+            change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            print(f"{case:<28} {metric:<18} {a:>12.3f} {b:>12.3f} {change:>9}")
+
+
+if __name__ == "__main__":
+    main()
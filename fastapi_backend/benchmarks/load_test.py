@@ -0,0 +1,128 @@
+"""Async load generator for a running backend.
+
+    # terminal 1: stub upstream, then the API pointed at it
+    python -m benchmarks.stub_node --port 5055 --latency-ms 30
+    NODE_SERVICE_URL=http://127.0.0.1:5055 RATE_LIMIT_PER_SECOND=0 python main.py
+    # terminal 2
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --concurrency 50 --duration 30 \\
+        --output results/load.json
+
+The endpoint mix is set with --mix, e.g. "ask=8,tips=1,health=1,twitter=0".
+Each worker asks as its own user_id; start the API with RATE_LIMIT_PER_SECOND=0
+(as above) unless the per-user rate limit is what you want to measure.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.stats import run_metadata, summarize, write_results
+from benchmarks.synthetic import QUESTION_TEMPLATES
+
+FOLLOW_UPS = ["where?", "how do I do that?", "who do I ask?", "what does it mean?"]
+USERNAMES = ["futo_official", "campus_ai", "dev_enyinnaya", "seet_futo", "fresher2025"]
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+async def worker(client: httpx.AsyncClient, mix: dict, deadline: float, remaining: list, results: dict,
+                 user_id: str):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    conversation_id = None
+    while time.perf_counter() < deadline and remaining[0] > 0:
+        remaining[0] -= 1
+        endpoint = random.choices(names, weights)[0]
+        if endpoint == "ask":
+            question = random.choice(FOLLOW_UPS) if conversation_id and random.random() < 0.3 else random.choice(QUESTION_TEMPLATES)
+            body = {"question": question, "user_id": user_id}
+            if conversation_id:
+                body["conversation_id"] = conversation_id
+            request = client.post("/chat/ask", json=body)
+        elif endpoint == "tips":
+            request = client.get("/chat/tips")
+        elif endpoint == "health":
+            request = client.get("/health")
+        elif endpoint == "twitter":
+            request = client.get(f"/auth/twitter/{random.choice(USERNAMES)}")
+        else:
+            raise ValueError(f"Unknown endpoint in mix: {endpoint}")
+
+        start = time.perf_counter()
+        try:
+            response = await request
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                results[endpoint]["errors"] += 1
+                results[endpoint]["status"][response.status_code] += 1
+            else:
+                results[endpoint]["latencies"].append(elapsed)
+                if endpoint == "ask":
+                    conversation_id = response.json().get("conversation_id")
+        except httpx.HTTPError as e:
+            results[endpoint]["errors"] += 1
+            results[endpoint]["status"][type(e).__name__] += 1
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    results = defaultdict(lambda: {"latencies": [], "errors": 0, "status": defaultdict(int)})
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        remaining = [args.requests or float("inf")]
+        await asyncio.gather(*[
+            worker(client, mix, deadline, remaining, results, f"load-{i}") for i in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    all_latencies = []
+    total_errors = 0
+    for name, data in results.items():
+        endpoints[name] = summarize(data["latencies"], elapsed, data["errors"])
+        if data["status"]:
+            endpoints[name]["failures"] = {str(k): v for k, v in data["status"].items()}
+        all_latencies.extend(data["latencies"])
+        total_errors += data["errors"]
+    return {
+        "benchmark": "load",
+        "meta": run_metadata(),
+        "config": {
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "requests": args.requests,
+            "mix": mix
+        },
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(all_latencies, elapsed, total_errors),
+        "endpoints": endpoints
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = duration only)")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--mix", default="ask=8,tips=1,health=1")
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args(argv)
+    write_results(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import List
+
+import numpy as np
+
+
+def summarize(latencies: List[float], elapsed: float = None, errors: int = 0) -> dict:
+    """Latency percentiles (ms) and throughput for one benchmark case"""
+    if not latencies:
+        return {"count": 0, "errors": errors}
+    values = np.asarray(latencies) * 1000.0
+    summary = {
+        "count": len(latencies),
+        "errors": errors,
+        "mean_ms": round(float(values.mean()), 4),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "max_ms": round(float(values.max()), 4)
+    }
+    if elapsed:
+        summary["throughput_per_s"] = round(len(latencies) / elapsed, 2)
+    return summary
+
+
+def run_metadata() -> dict:
+    """Enough context to tell two result files apart"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def write_results(results: dict, output: str = None):
+    """Print results as JSON and optionally save them for later comparison"""
+    text = json.dumps(results, indent=2)
+    print(text)
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as f:
+            f.write(text + "\n")
@@ -0,0 +1,75 @@
+"""Stand-in for the Node Origin microservice with injectable latency and failures.
+
+    python -m benchmarks.stub_node --port 5000 --latency-ms 50 --jitter-ms 20 --failure-rate 0.1
+
+Serves /health, /auth/socials and /twitter/user/{username} with the same
+response shapes as node_microservice/server.js.
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(latency_ms: float, jitter_ms: float, failure_rate: float, hang_rate: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000.0
+            if random.random() < hang_rate:
+                # Simulate an upstream that stops answering (triggers client timeouts)
+                delay = 60.0
+            time.sleep(delay)
+
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "service": "CampusAI Origin Microservice (stub)", "authenticated": True})
+                return
+            if random.random() < failure_rate:
+                self._send(500, {"success": False, "error": "injected failure"})
+                return
+            if self.path == "/auth/socials":
+                self._send(200, {"success": True, "data": {"twitter": True, "spotify": False, "tiktok": False}})
+            elif self.path.startswith("/twitter/user/"):
+                username = self.path.rsplit("/", 1)[-1]
+                self._send(200, {"success": True, "data": {"username": username, "followers": 42}})
+            else:
+                self._send(404, {"success": False, "error": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of /auth and /twitter calls answered with 500")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of calls that stall for 60s")
+    args = parser.parse_args(argv)
+
+    handler = make_handler(args.latency_ms, args.jitter_ms, args.failure_rate, args.hang_rate)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"Stub Node service on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
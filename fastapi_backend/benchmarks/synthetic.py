@@ -0,0 +1,55 @@
+import random
+import string
+from typing import List
+
+# Real FAQ keys keep the keyword rules (greeting, follow-up, keyword) exercised
+BASE_TOPICS = ["fees", "portal", "clearance", "timetable", "group_chat", "msrc", "hostel", "library", "exam", "result"]
+
+QUESTION_TEMPLATES = [
+    "How do I pay school fees?",
+    "Where do I do clearance?",
+    "How do I get my timetable?",
+    "How do I join my department group chat?",
+    "What is MSRC?",
+    "hello",
+    "where is the library",
+    "any tips for freshers?",
+]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+
+
+def make_knowledge_base(n_faqs: int, vocabulary: int = 20000, seed: int = 7) -> dict:
+    """A campus_knowledge.json-shaped dict with n_faqs FAQs of random prose"""
+    rng = random.Random(seed)
+    words = [_word(rng) for _ in range(vocabulary)]
+    faqs = {topic: f"About {topic.replace('_', ' ')}: " + " ".join(rng.choices(words, k=30)) for topic in BASE_TOPICS}
+    for i in range(max(0, n_faqs - len(faqs))):
+        faqs[f"topic_{i}"] = " ".join(rng.choices(words, k=rng.randint(20, 60)))
+    return {
+        "general_info": {"campus_name": "Synthetic University", "short_name": "SU"},
+        "faqs": faqs,
+        "locations": {f"building_{i}": " ".join(rng.choices(words, k=12)) for i in range(max(4, n_faqs // 50))},
+        "important_contacts": {},
+        "quick_tips": [" ".join(rng.choices(words, k=8)) for _ in range(10)]
+    }
+
+
+def make_questions(data: dict, n: int, seed: int = 11) -> List[str]:
+    """Question corpus: templated keyword questions, free-text FAQ lookups and misses"""
+    rng = random.Random(seed)
+    faq_texts = list(data["faqs"].values())
+    questions = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.4:
+            questions.append(rng.choice(QUESTION_TEMPLATES))
+        elif roll < 0.8:
+            text = rng.choice(faq_texts).split()
+            questions.append("what about " + " ".join(rng.sample(text, min(3, len(text)))))
+        else:
+            # Out-of-vocabulary words: these fall through to the help message
+            questions.append(" ".join(_word(rng) for _ in range(5)))
+    return questions
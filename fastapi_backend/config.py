@@ -3,11 +3,101 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # Node Microservice
     node_service_url: str = "http://localhost:5000"
+    node_http2: bool = False  # needs `pip install httpx[http2]`
+    node_max_connections: int = 20
+    node_max_keepalive_connections: int = 10
+    node_keepalive_expiry: float = 30.0
+    node_connect_timeout: float = 2.0
+    node_timeout: float = 10.0
+    node_health_timeout: float = 5.0
+    node_socials_timeout: float = 10.0
+    node_twitter_timeout: float = 10.0
+    node_probe_interval: float = 10.0  # background health checks, 0 disables them
+    node_breaker_failure_threshold: int = 5
+    node_breaker_reset_timeout: float = 30.0
+    
+    # Origin lookup cache (seconds; errors are cached briefly to shield the upstream)
+    origin_cache_size: int = 1024
+    origin_socials_ttl: float = 60.0
+    origin_twitter_ttl: float = 300.0
+    origin_error_ttl: float = 5.0
     
     # FastAPI
     api_port: int = 8000
+    api_workers: int = 1
     debug: bool = True
     
+    # Knowledge base
+    knowledge_base_path: str = "campus_knowledge.json"
+    knowledge_artifact_path: str = "campus_knowledge.kbc"  # built by `python -m services.knowledge_artifact build`
+    knowledge_reload_interval: float = 5.0  # seconds between mtime checks, 0 disables the watcher
+    knowledge_cache_max_age: int = 60  # Cache-Control max-age of /chat/categories and /chat/tips
+    admin_token: str = ""  # required as X-Admin-Token on /admin routes, which are disabled while empty
+    
+    # Campuses: the default one is served from knowledge_base_path, others from <campuses_dir>/<id>.json
+    default_campus: str = "futo"
+    campuses_dir: str = "campuses"
+    campus_cache_bytes: int = 512 * 1024 * 1024  # estimated memory budget for loaded campuses
+    
+    # Conversation memory ("memory" is per-process, "sqlite" is shared by all workers)
+    conversation_backend: str = "memory"
+    conversation_db_path: str = "conversations.db"
+    conversation_cache_ttl_seconds: float = 1.0
+    conversation_flush_interval_seconds: float = 0.25
+    conversation_max_entries: int = 10000
+    conversation_ttl_seconds: float = 1800  # idle conversations are dropped after this
+    
+    # Query log for coverage analysis (`python -m services.query_log analyze`); empty dir disables it
+    query_log_dir: str = "query_logs"
+    query_log_max_bytes: int = 64 * 1024 * 1024  # start a new file after this size...
+    query_log_rotate_seconds: float = 3600  # ...or this age
+    query_log_flush_interval: float = 1.0
+    query_log_max_pending: int = 100000  # records queued beyond this are dropped
+    
+    # Related topics: transitions seen in conversations, topped up with topics each answer mentions
+    related_topics_limit: int = 3
+    related_topics_from_query_log: bool = True  # replay earlier query logs at startup
+    
+    # Admission control for /chat/ask* (0 disables a limit)
+    rate_limit_per_second: float = 2.0  # sustained questions per user_id / conversation / client
+    rate_limit_burst: int = 20
+    rate_limit_max_keys: int = 100000
+    max_concurrent_requests: int = 64
+    max_waiting_requests: int = 64
+    admission_wait_timeout: float = 0.1  # seconds a request may wait for a slot before 503
+    
+    # Matcher execution: "inline" (on the event loop), "thread" or "process" pool
+    matcher_executor: str = "thread"
+    matcher_workers: int = 4
+    matcher_queue_size: int = 64  # calls allowed to wait for a worker before new ones get 503
+    matcher_timeout: float = 2.0  # per-request deadline in seconds
+    matcher_batch_timeout: float = 30.0  # deadline for one /chat/ask/batch wave
+    
+    # WebSocket chat sessions (/chat/ws)
+    ws_max_messages: int = 1000  # frames per connection before the server closes it
+    ws_max_message_chars: int = 4096
+    ws_idle_timeout: float = 300.0  # seconds without a frame before the server closes it
+    
+    # Batch endpoint
+    batch_max_questions: int = 20  # also capped at RATE_LIMIT_BURST while rate limiting is on
+    
+    # Answer cache (0 disables it)
+    answer_cache_size: int = 4096
+    
+    # Retrieval
+    retrieval_top_k: int = 3
+    retrieval_min_score: float = 3.2  # below this we fall back to the help message; off-topic one-word hits score up to ~3.0
+    retrieval_mode: str = "keyword"  # default for requests that don't pick one: keyword, semantic or hybrid
+    semantic_min_score: float = 0.25  # minimum cosine similarity in semantic mode; off-topic questions score up to ~0.27
+    semantic_min_lead_score: float = 0.32  # minimum cosine plus its lead over the best hit with a different answer
+    hybrid_min_score: float = 0.33  # minimum blended score in hybrid mode; off-topic single-keyword hits blend to ~0.32
+    hybrid_min_lead_score: float = 0.45  # minimum blended score plus its lead over the best hit with a different answer
+    hybrid_semantic_weight: float = 0.5  # share of the cosine score in the hybrid blend
+    semantic_ann_probes: int = 8  # clusters searched when the knowledge base is large enough for ANN
+    
+    # Typo tolerance: max edit distance for fuzzy keyword matches (0 disables, at most 2)
+    fuzzy_max_distance: int = 2
+    
     # AI Provider (optional for now)
     openai_api_key: str = ""
     
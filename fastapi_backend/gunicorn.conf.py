@@ -0,0 +1,13 @@
+# Production server: gunicorn -c gunicorn.conf.py main:app
+#
+# preload_app imports the app (and loads the knowledge base artifact) once in
+# the master, so forked workers share those pages instead of each building
+# their own copy. Anything that holds threads or connections (the
+# conversation store, the matcher pool) is created in main.lifespan, which
+# runs in each worker after the fork.
+from config import settings
+
+bind = f"0.0.0.0:{settings.api_port}"
+workers = settings.api_workers
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
@@ -1,14 +1,53 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import chat, auth
+from fastapi.responses import PlainTextResponse
+from routers import chat, auth, admin
 from services.origin_service import origin_service
+from services.query_log import log_files
+from services.conversation_store import create_conversation_store
+from services import metrics
 from models.schemas import HealthResponse
 from config import settings
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Conversation store, built per worker (a SQLite connection must not cross a fork)
+    chat.conversations = create_conversation_store(settings)
+    # One pooled HTTP client for all calls to the Node microservice
+    await origin_service.start()
+    # Thread or process pool for matcher work (process workers load the knowledge base now)
+    chat.matcher.start()
+    # Probe the Node service in the background so /health never waits on it
+    prober = None
+    if settings.node_probe_interval > 0:
+        prober = asyncio.create_task(origin_service.probe_forever(settings.node_probe_interval))
+    # Watch the knowledge base file of every loaded campus and hot-reload it when it changes
+    watcher = None
+    if settings.knowledge_reload_interval > 0:
+        watcher = asyncio.create_task(chat.campuses.watch(settings.knowledge_reload_interval))
+    # Rebuild the related-topics graphs from earlier query logs without delaying startup
+    replay = None
+    if settings.related_topics_from_query_log and settings.query_log_dir:
+        replay = asyncio.create_task(asyncio.to_thread(chat.replay_query_log, log_files(settings.query_log_dir)))
+    yield
+    for task in (watcher, prober, replay):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await origin_service.close()
+    chat.matcher.close()
+    # Persist any deferred conversation writes and queued query log records before the worker exits
+    chat.conversations.close()
+    chat.query_log.close()
+
 app = FastAPI(
     title="CampusAI Assistant API",
     description="AI-powered assistant for campus freshers",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -20,9 +59,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, status codes and in-flight requests for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# State sampled when /metrics is scraped, so the hot path pays nothing for it
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+metrics.registry.gauge(
+    "campusai_conversations", "Conversations held by the conversation store (sqlite: as of its last purge, refreshed every minute)",
+    function=lambda: len(chat.conversations)
+)
+metrics.registry.gauge(
+    "campusai_answer_cache_entries", "Entries in the answer cache",
+    function=lambda: len(chat.answer_cache)
+)
+metrics.registry.counter(
+    "campusai_answer_cache_lookups_total", "Answer cache lookups by result", ("result",),
+    function=lambda: {("hit",): chat.answer_cache.hits, ("miss",): chat.answer_cache.misses}
+)
+metrics.registry.gauge(
+    "campusai_knowledge_base_info", "Live knowledge base version", ("version", "source"),
+    function=lambda: {(chat.knowledge.current.version, chat.knowledge.current.source): 1}
+)
+metrics.registry.gauge(
+    "campusai_campuses_loaded", "Campus knowledge bases resident in memory",
+    function=lambda: chat.campuses.stats()["resident"]
+)
+metrics.registry.gauge(
+    "campusai_campuses_memory_bytes", "Estimated memory of loaded non-default campuses",
+    function=lambda: chat.campuses.stats()["resident_bytes"]
+)
+metrics.registry.counter(
+    "campusai_campus_loads_total", "Campus loads and evictions", ("event",),
+    function=lambda: {("load",): chat.campuses.loads, ("eviction",): chat.campuses.evictions}
+)
+metrics.registry.gauge(
+    "campusai_matcher_pool_pending", "Matcher calls running or queued in the pool",
+    function=lambda: chat.matcher.pending
+)
+metrics.registry.gauge(
+    "campusai_matcher_pool_saturation", "Pending matcher calls over pool capacity (workers + queue)",
+    function=lambda: chat.matcher.pending / max(1, chat.matcher.workers + chat.matcher.queue_size)
+)
+metrics.registry.gauge(
+    "campusai_admission_in_flight", "Ask requests holding an admission slot",
+    function=lambda: chat.admission.concurrency.in_flight
+)
+metrics.registry.gauge(
+    "campusai_admission_waiting", "Ask requests waiting for an admission slot",
+    function=lambda: chat.admission.concurrency.waiting
+)
+metrics.registry.gauge(
+    "campusai_admission_tracked_callers", "Callers with a live rate limit bucket",
+    function=lambda: len(chat.admission.buckets)
+)
+metrics.registry.gauge(
+    "campusai_query_log_pending", "Query log records waiting for the background writer",
+    function=lambda: chat.query_log.stats()["pending"]
+)
+metrics.registry.counter(
+    "campusai_query_log_records_total", "Query log records written or dropped", ("outcome",),
+    function=lambda: {("written",): chat.query_log.records_written, ("dropped",): chat.query_log.dropped}
+)
+metrics.registry.gauge(
+    "campusai_chat_sockets", "Open /chat/ws connections",
+    function=lambda: chat.socket_stats["open"]
+)
+metrics.registry.counter(
+    "campusai_chat_socket_frames_total", "Question frames answered over /chat/ws",
+    function=lambda: chat.socket_stats["turns"]
+)
+metrics.registry.gauge(
+    "campusai_origin_circuit_state", "Node microservice circuit (0 closed, 1 half-open, 2 open)",
+    function=lambda: BREAKER_STATES[origin_service.breaker.state]
+)
+metrics.registry.gauge(
+    "campusai_origin_pool_connections", "Pooled connections to the Node microservice", ("state",),
+    function=lambda: {
+        ("idle",): origin_service.stats().get("idle_connections", 0),
+        ("active",): origin_service.stats().get("active_connections", 0)
+    }
+)
+
 # Include routers
 app.include_router(chat.router)
 app.include_router(auth.router)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
@@ -34,15 +155,31 @@ async def root():
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Check API and Node microservice health"""
-    node_health = await origin_service.check_health()
+    """Check API and Node microservice health (from the cached background probe)"""
+    node_health = origin_service.last_health
+    if node_health is None:
+        # Prober disabled or not run yet
+        node_health = await origin_service.probe()
     
     return HealthResponse(
         status="ok",
         service="CampusAI FastAPI Backend",
-        node_service_connected="status" in node_health and node_health["status"] == "ok"
+        node_service_connected=node_health["connected"],
+        node_checked_at=node_health["checked_at"],
+        node_circuit=origin_service.breaker.state
     )
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/health/origin")
+async def origin_pool_stats():
+    """Connection pool stats for the Node microservice client"""
+    return origin_service.stats()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=settings.api_port)
\ No newline at end of file
+    # Several workers need an import string; share conversations with CONVERSATION_BACKEND=sqlite
+    uvicorn.run("main:app", host="0.0.0.0", port=settings.api_port, workers=settings.api_workers)
\ No newline at end of file
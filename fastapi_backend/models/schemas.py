@@ -1,18 +1,24 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 class QuestionRequest(BaseModel):
     question: str
     user_id: Optional[str] = None
     conversation_id: Optional[str] = None  # For tracking conversations
+    retrieval_mode: Optional[Literal["keyword", "semantic", "hybrid"]] = None  # Defaults to settings.retrieval_mode
+    campus: Optional[str] = None  # Campus id, defaults to settings.default_campus
 
 class AnswerResponse(BaseModel):
     answer: str
     source: str = "CampusAI"
     conversation_id: Optional[str] = None
     related_topics: Optional[List[str]] = None
+    kb_version: Optional[str] = None  # Knowledge base version that produced the answer
+    campus: Optional[str] = None
 
 class HealthResponse(BaseModel):
     status: str
     service: str
-    node_service_connected: bool
\ No newline at end of file
+    node_service_connected: bool
+    node_checked_at: Optional[float] = None  # When the background probe last ran
+    node_circuit: Optional[str] = None  # closed / open / half_open
\ No newline at end of file
@@ -0,0 +1,53 @@
+import asyncio
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from routers.chat import campuses
+from config import settings
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+def check_admin_token(token: Optional[str]):
+    """Reject the request unless it carries the configured admin token (every request if none is set)"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Admin routes are disabled, set ADMIN_TOKEN to enable them")
+    if not hmac.compare_digest((token or "").encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+async def campus_manager(campus: Optional[str]):
+    """The knowledge base manager of a campus (the default one if None), loading it if needed"""
+    campus = campus or settings.default_campus
+    try:
+        return await campuses.load(campus)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown campus '{campus}'")
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Knowledge base not loaded: {type(e).__name__}: {e}")
+
+@router.post("/reload")
+async def reload_knowledge(campus: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Re-read a campus's knowledge base file and atomically swap in the rebuilt indexes"""
+    check_admin_token(x_admin_token)
+    knowledge = await campus_manager(campus)
+    previous = knowledge.current.version
+    try:
+        # Parsing and indexing is CPU work, keep it off the event loop
+        changed = await asyncio.to_thread(knowledge.reload, True)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Knowledge base not reloaded: {type(e).__name__}: {e}")
+    return {
+        "reloaded": changed,
+        "previous_version": previous,
+        **knowledge.current.info()
+    }
+
+@router.get("/knowledge")
+async def knowledge_info(campus: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Get the live knowledge base version and reload status"""
+    check_admin_token(x_admin_token)
+    knowledge = await campus_manager(campus)
+    return {
+        **knowledge.current.info(),
+        "reloads": knowledge.reloads,
+        "last_error": knowledge.last_error
+    }
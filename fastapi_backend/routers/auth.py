@@ -1,16 +1,27 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from services.origin_service import origin_service
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+def upstream_response(result: dict):
+    """Turn a fast-failed call (open circuit) into a 503 with Retry-After"""
+    if result.get("circuit") == "open":
+        return JSONResponse(
+            status_code=503,
+            content=result,
+            headers={"Retry-After": str(result["retry_after"])}
+        )
+    return result
+
 @router.get("/socials")
 async def get_linked_socials():
     """Get user's linked social accounts from Origin"""
     result = await origin_service.get_linked_socials()
-    return result
+    return upstream_response(result)
 
 @router.get("/twitter/{username}")
 async def get_twitter_user(username: str):
     """Get Twitter user data from Origin"""
     result = await origin_service.get_twitter_user(username)
-    return result
\ No newline at end of file
+    return upstream_response(result)
\ No newline at end of file
@@ -1,43 +1,262 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from models.schemas import QuestionRequest, AnswerResponse
+from services.knowledge_base import KnowledgeBase, KnowledgeBaseManager
+from services.campus_registry import CampusRegistry
+from services.conversation_store import ConversationStore
+from services.answer_cache import AnswerCache, normalize_question
+from services.matcher_pool import MatcherPool, PoolSaturatedError, DeadlineExceededError, VersionMismatchError
+from services.query_log import QueryLog, read_records
+from services.precompressed import PrecompressedJSON
+from services.related_topics import RelatedTopicsGraph, replay_transitions
+from services.admission import AdmissionController, RateLimitedError, OverCapacityError, retry_after_header
+from services import metrics
+from config import settings
+from typing import Dict, Any, List, Optional, Tuple
+from contextlib import asynccontextmanager
+import asyncio
 import json
-from typing import Dict, Any
+import logging
+import re
+import time
 import uuid
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-# Load campus knowledge
-with open("campus_knowledge.json") as f:
-    campus_data = json.load(f)
-
-# Simple in-memory conversation storage (for demo purposes)
-conversations = {}
-
-def get_related_topics(category: str) -> list:
-    """Get related topics based on the current category"""
-    related_map = {
-        "fees": ["portal", "payment", "gmail"],
-        "portal": ["fees", "registration", "result"],
-        "clearance": ["ict", "id_card"],
-        "lecture_hall": ["timetable", "class", "group_chat"],
-        "timetable": ["group_chat", "msrc", "lecture_hall"],
-        "group_chat": ["msrc", "timetable"],
-        "msrc": ["group_chat", "department"],
-        "department": ["msrc", "software_engineering"],
-        "ict": ["clearance", "id_card"],
-        "registration": ["portal", "course_adviser"],
-        "exam": ["attendance", "result"],
-        "gmail": ["portal", "fees"]
-    }
-    return related_map.get(category, [])
+# Load campus knowledge (hot-reloadable, see services/knowledge_base.py)
+knowledge = KnowledgeBaseManager(settings.knowledge_base_path, settings.knowledge_artifact_path)
+
+# Other campuses, loaded on first use and evicted LRU under a memory budget
+campuses = CampusRegistry(settings.default_campus, knowledge, settings.campuses_dir, settings.campus_cache_bytes)
+
+# Conversation storage (bounded in-memory LRU, or SQLite shared across workers). Built by
+# main.lifespan at startup, so under gunicorn's preload_app no connection or writer thread
+# exists in the master before it forks
+conversations: Optional[ConversationStore] = None
+
+# Matcher results for repeated questions, keyed by knowledge base version
+answer_cache = AnswerCache(max_entries=settings.answer_cache_size)
+
+# Every answered question, written in the background for offline coverage analysis
+query_log = QueryLog(
+    settings.query_log_dir, settings.query_log_max_bytes, settings.query_log_rotate_seconds,
+    settings.query_log_flush_interval, max_pending=settings.query_log_max_pending
+)
+
+# Stands in for the graph of a campus evicted while one of its requests was still running
+NO_RELATED_TOPICS = RelatedTopicsGraph()
+
+# Open /chat/ws connections, questions answered (not error frames), and connections closed at the message cap
+socket_stats = {"open": 0, "turns": 0, "capped": 0}
+
+# Matcher calls run here so slow matches never block the event loop
+matcher = MatcherPool(
+    settings.matcher_executor, settings.matcher_workers, settings.matcher_queue_size,
+    resolver="routers.chat:pinned_knowledge", warm=(settings.default_campus, None)
+)
+
+# Per-caller rate limits and a global concurrency limit for the ask endpoints
+admission = AdmissionController(
+    settings.rate_limit_per_second, settings.rate_limit_burst, settings.rate_limit_max_keys,
+    settings.max_concurrent_requests, settings.max_waiting_requests, settings.admission_wait_timeout
+)
+
+def client_key(http_request: Request) -> str:
+    return f"client:{http_request.client.host if http_request.client else 'unknown'}"
+
+def caller_key(request: QuestionRequest) -> Optional[str]:
+    """Rate limit key: the user if known, else the conversation.
+
+    Anonymous first turns get no bucket (only the global concurrency limit):
+    behind a frontend or proxy every visitor shares one client address, so
+    keying them on it would throttle all new sessions together.
+    """
+    if request.user_id:
+        return f"user:{request.user_id}"
+    if request.conversation_id:
+        return f"conversation:{request.conversation_id}"
+    return None
+
+@asynccontextmanager
+async def admitted(key: Optional[str], cost: float = 1.0):
+    """Hold an admission slot for the block, refusing with 429 or 503 and Retry-After"""
+    try:
+        async with admission.admit(key, cost):
+            yield
+    except RateLimitedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many questions, please slow down",
+            headers={"Retry-After": retry_after_header(e.retry_after)}
+        )
+    except OverCapacityError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": retry_after_header(e.retry_after)}
+        )
+
+def pinned_knowledge(campus: str, version: Optional[str] = None) -> KnowledgeBase:
+    """A campus's knowledge base in a matcher pool process, reloaded if the caller pinned another version.
+
+    Answering from any other version would also poison the answer cache, which
+    is keyed on the pinned one, so a version that still differs after a forced
+    reload (the file changed again, or is broken) fails the call.
+    """
+    manager = campuses.get(campus)
+    if version is not None and manager.current.version != version:
+        try:
+            manager.reload(force=True)
+        except Exception as e:
+            raise VersionMismatchError(f"Knowledge base {version} of {campus} not loadable: {type(e).__name__}: {e}")
+        if manager.current.version != version:
+            raise VersionMismatchError(
+                f"Knowledge base {version} of {campus} pinned, but the file now holds {manager.current.version}"
+            )
+    return manager.current
+
+async def run_matcher(func, campus: str, kb: KnowledgeBase, *args, timeout: float, **kwargs):
+    """Run a matcher function in the pool, mapping saturation to 503 and a missed deadline to 504.
+
+    Returns (result, seconds the function ran).
+    """
+    try:
+        return await matcher.run_timed(func, campus, kb, *args, timeout=timeout, **kwargs)
+    except PoolSaturatedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many questions in flight, please retry",
+            headers={"Retry-After": str(round(e.retry_after))}
+        )
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except VersionMismatchError as e:
+        # The file changed under the request; a retry pins the version now on disk
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+async def campus_knowledge(campus: Optional[str]) -> Tuple[str, KnowledgeBase]:
+    """Resolve a campus id to its live knowledge base, loading it on first use"""
+    campus = campus or settings.default_campus
+    try:
+        manager = await campuses.load(campus)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown campus '{campus}'")
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Knowledge base for campus '{campus}' unavailable: {type(e).__name__}: {e}")
+    return campus, manager.current
+
+def conversation_key(campus: str, conversation_id: str) -> str:
+    """Conversation store key; the same conversation id on two campuses is two conversations"""
+    if campus == settings.default_campus:
+        return conversation_id
+    return f"{campus}:{conversation_id}"
+
+def related_graph(campus: str) -> Optional[RelatedTopicsGraph]:
+    """A resident campus's related-topics graph (it lives and is evicted with the campus), else None"""
+    manager = campuses.peek(campus)
+    return manager.related if manager is not None else None
+
+def get_related_topics(category: str, kb: KnowledgeBase = None, campus: str = None) -> list:
+    """Answerable topics conversations most often move to from category, topped up from the knowledge base"""
+    kb = kb or knowledge.current
+    return (related_graph(campus or settings.default_campus) or NO_RELATED_TOPICS).related(
+        category, kb.data["faqs"], kb.related_map.get(category, ()), settings.related_topics_limit
+    )
+
+def replay_query_log(paths: List[str]):
+    """Seed the related-topics graphs of resident campuses with the category transitions in earlier query logs"""
+    try:
+        replay_transitions(read_records(paths), related_graph, settings.default_campus)
+    except (OSError, EOFError) as e:
+        # A log rotated away or truncated mid-read: keep what was replayed so far
+        logger.warning("Query log replay stopped early: %s", e)
+
+# Ranked stage per retrieval mode: (match_path, source label, minimum score, minimum score plus lead)
+RANKED_MODES = {
+    "keyword": ("ranked", "Ranked", lambda: settings.retrieval_min_score, lambda: 0.0),
+    "semantic": ("semantic", "Semantic", lambda: settings.semantic_min_score,
+                 lambda: settings.semantic_min_lead_score),
+    "hybrid": ("hybrid", "Hybrid", lambda: settings.hybrid_min_score, lambda: settings.hybrid_min_lead_score)
+}
 
-def find_best_answer(query: str, conversation_context: dict = None) -> Dict[str, Any]:
+def ranked_search(queries: List[str], kb: KnowledgeBase, mode: str) -> List[list]:
+    """Top-k (doc_id, score) hits for each query from the index the retrieval mode selects"""
+    if mode == "semantic":
+        return kb.semantic.search_batch(queries, settings.retrieval_top_k, settings.semantic_ann_probes)
+    if mode == "hybrid":
+        return kb.semantic.search_hybrid_batch(
+            queries, kb.retriever, settings.retrieval_top_k,
+            weight=settings.hybrid_semantic_weight,
+            keyword_scale=settings.retrieval_min_score,
+            probes=settings.semantic_ann_probes
+        )
+    return kb.retriever.search_batch(queries, settings.retrieval_top_k)
+
+def find_best_answer(query: str, conversation_context: dict = None, kb: KnowledgeBase = None,
+                     mode: str = None) -> Dict[str, Any]:
     """Find the best matching answer from knowledge base with context awareness"""
-    query_lower = query.lower()
+    kb = kb or knowledge.current
+    mode = mode or settings.retrieval_mode
+    result, query, corrections = match_query(query, conversation_context, kb)
+    if result is None:
+        result = ranked_answer(ranked_search([query], kb, mode)[0], kb, mode)
+    if corrections:
+        result = fuzzy_result(result, corrections)
+    return result
+
+def find_best_answers(queries: List[str], conversation_contexts: List[dict], kb: KnowledgeBase = None,
+                      modes: List[str] = None) -> List[Dict[str, Any]]:
+    """find_best_answer for many questions; the ranked fallback is scored in one vectorized batch per mode"""
+    kb = kb or knowledge.current
+    modes = modes or [None] * len(queries)
+    matched = [match_query(query, context, kb) for query, context in zip(queries, conversation_contexts)]
+    results = [result for result, _, _ in matched]
+    pending: Dict[str, List[int]] = {}
+    for i, result in enumerate(results):
+        if result is None:
+            pending.setdefault(modes[i] or settings.retrieval_mode, []).append(i)
+    for mode, indexes in pending.items():
+        ranked = ranked_search([matched[i][1] for i in indexes], kb, mode)
+        for i, hits in zip(indexes, ranked):
+            results[i] = ranked_answer(hits, kb, mode)
+    for i, (_, _, corrections) in enumerate(matched):
+        if corrections:
+            results[i] = fuzzy_result(results[i], corrections)
+    return results
+
+def match_query(query: str, conversation_context: dict, kb: KnowledgeBase):
+    """match_rules, retried on a typo-corrected query; returns (result, query used, corrections)"""
+    result = match_rules(query, conversation_context, kb)
+    if result is not None or settings.fuzzy_max_distance <= 0:
+        return result, query, []
+    corrected, corrections = kb.fuzzy.correct(query, settings.fuzzy_max_distance)
+    if not corrections:
+        return None, query, []
+    return match_rules(corrected, conversation_context, kb), corrected, corrections
+
+def fuzzy_result(result: Dict[str, Any], corrections: list) -> Dict[str, Any]:
+    """Report the spelling corrections an answer relied on in its source"""
+    if result["match_path"] == "fallback":
+        return result
+    fixes = ", ".join(f"{typo} → {fix}" for typo, fix in corrections)
+    return dict(result, source=f"CampusAI Knowledge Base (Fuzzy match: {fixes})", match_path="fuzzy")
+
+def detect_intent(hits: Dict[str, list]) -> Optional[str]:
+    """The question's intent: its first question word, else its first follow-up phrase"""
+    for kind in ("question", "followup"):
+        if kind in hits:
+            return min(hits[kind], key=lambda match: match.start).value
+    return None
+
+def match_rules(query: str, conversation_context: dict, kb: KnowledgeBase) -> Optional[Dict[str, Any]]:
+    """Greeting, follow-up, keyword, location and tips rules; None if none of them apply"""
+    campus_data = kb.data
+    hits = kb.matcher.find_by_kind(query)
     
-    # Handle greetings - ADD THIS BLOCK
-    greetings = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening", "greetings"]
-    if any(greeting in query_lower for greeting in greetings):
+    # Handle greetings
+    if "greeting" in hits:
         return {
             "answer": "Hello! 👋 Welcome to CampusAI Assistant for FUTO!\n\n"
                      "I'm here to help you with:\n"
@@ -49,122 +268,89 @@ def find_best_answer(query: str, conversation_context: dict = None) -> Dict[str,
                      "• And much more!\n\n"
                      "What would you like to know about campus life?",
             "source": "CampusAI",
-            "category": "greeting"
+            "category": "greeting",
+            "match_path": "greeting"
         }
     
-    # Enhanced keyword mapping
-    keyword_map = {
-        "fee": "fees",
-        "payment": "fees",
-        "pay": "fees",
-        "school fees": "school_fees",
-        "portal": "portal",
-        "website": "portal",
-        "clearance": "clearance",
-        "clear": "clearance",
-        "lecture": "lecture_hall",
-        "class": "class",
-        "hall": "lecture_hall",
-        "timetable": "timetable",
-        "schedule": "timetable",
-        "time table": "timetable",
-        "group chat": "group_chat",
-        "whatsapp": "group_chat",
-        "telegram": "group_chat",
-        "msrc": "msrc",
-        "student rep": "student_representative",
-        "representative": "student_representative",
-        "department": "department",
-        "dept": "dept",
-        "software": "software_engineering",
-        "registration": "registration",
-        "register": "registration",
-        "hostel": "hostel",
-        "accommodation": "hostel",
-        "library": "library",
-        "id card": "id_card",
-        "student id": "id_card",
-        "result": "result",
-        "grade": "result",
-        "exam": "exam",
-        "test": "exam",
-        "attendance": "attendance",
-        "course adviser": "course_adviser",
-        "adviser": "course_adviser",
-        "gmail": "gmail",
-        "email": "email",
-        "ict": "ict"
-    }
+    # Handle follow-up questions with context: one lookup on (last category, intent)
+    asked = {match.value for match in hits.get("question", [])}
+    last_category = (conversation_context or {}).get("last_category")
+    if last_category:
+        target = kb.followups.get((last_category, detect_intent(hits)))
+        if target is not None:
+            return {
+                "answer": campus_data["faqs"][target],
+                "source": "CampusAI Knowledge Base (Context-aware)",
+                "category": target,
+                "match_path": "followup"
+            }
     
-    # Handle follow-up questions with context
-    if conversation_context and conversation_context.get("last_category"):
-        last_category = conversation_context["last_category"]
-        
-        # Follow-up question patterns
-        followup_patterns = {
-            "where": ["location", "find it", "located", "place"],
-            "how": ["do i", "can i", "to get", "process"],
-            "what": ["is it", "does it", "mean", "about"],
-            "who": ["contact", "ask", "person"],
-            "when": ["time", "open", "available"]
-        }
-        
-        # Check if this is a follow-up question
-        for pattern_type, patterns in followup_patterns.items():
-            if pattern_type in query_lower or any(p in query_lower for p in patterns):
-                # Try to provide context-aware answer
-                if last_category == "fees" and ("where" in query_lower or "how" in query_lower):
-                    return {
-                        "answer": campus_data["faqs"].get("portal", "Check the school portal via your Gmail."),
-                        "source": "CampusAI Knowledge Base (Context-aware)",
-                        "category": "portal"
-                    }
-                elif last_category == "clearance" and "where" in query_lower:
-                    return {
-                        "answer": campus_data["faqs"].get("ict", "ICT building, ground floor."),
-                        "source": "CampusAI Knowledge Base (Context-aware)",
-                        "category": "ict"
-                    }
-                elif last_category == "timetable" and ("where" in query_lower or "how" in query_lower):
-                    return {
-                        "answer": campus_data["faqs"].get("group_chat", "Ask your MSRC to add you to the department group chat."),
-                        "source": "CampusAI Knowledge Base (Context-aware)",
-                        "category": "group_chat"
-                    }
-                elif last_category in ["group_chat", "timetable"] and ("who" in query_lower or "what" in query_lower):
-                    return {
-                        "answer": campus_data["faqs"].get("msrc", "MSRC is your Student Representative."),
-                        "source": "CampusAI Knowledge Base (Context-aware)",
-                        "category": "msrc"
-                    }
-    
-    # Regular keyword matching
-    for keyword, faq_key in keyword_map.items():
-        if keyword in query_lower:
-            if faq_key in campus_data["faqs"]:
-                return {
-                    "answer": campus_data["faqs"][faq_key],
-                    "source": "CampusAI Knowledge Base",
-                    "category": faq_key
-                }
+    # Regular keyword matching (longest keyword wins)
+    for match in hits.get("keyword", []):
+        faq_key = match.value
+        if faq_key in campus_data["faqs"]:
+            return {
+                "answer": campus_data["faqs"][faq_key],
+                "source": "CampusAI Knowledge Base",
+                "category": faq_key,
+                "match_path": "keyword"
+            }
     
     # Location queries
-    if "where" in query_lower:
-        for location, address in campus_data["locations"].items():
-            if any(word in query_lower for word in location.split("_")):
-                return {
-                    "answer": f"{address}",
-                    "source": "CampusAI Knowledge Base",
-                    "category": "location"
-                }
+    if "where" in asked and "location" in hits:
+        location = hits["location"][0].value
+        return {
+            "answer": f"{campus_data['locations'][location]}",
+            "source": "CampusAI Knowledge Base",
+            "category": "location",
+            "match_path": "location"
+        }
     
     # Tips query
-    if "tip" in query_lower or "advice" in query_lower:
+    if "tips" in hits:
         tips = "\n".join([f"• {tip}" for tip in campus_data["quick_tips"][:5]])
         return {
             "answer": f"Here are some helpful tips for FUTO freshers:\n\n{tips}",
             "source": "CampusAI Knowledge Base",
-            "category": "tips"
+            "category": "tips",
+            "match_path": "tips"
+        }
+    
+    return None
+
+def ranked_text(doc_id: str, campus_data: dict) -> str:
+    doc_kind, key = doc_id.split(":", 1)
+    return campus_data["faqs" if doc_kind == "faq" else "locations"][key]
+
+def ranked_lead(ranked: list, campus_data: dict) -> float:
+    """How far the top hit scores above the best hit with a different answer"""
+    top = ranked_text(ranked[0][0], campus_data)
+    for doc_id, score in ranked[1:]:
+        if ranked_text(doc_id, campus_data) != top:
+            return ranked[0][1] - score
+    return ranked[0][1]
+
+def ranked_answer(ranked: list, kb: KnowledgeBase, mode: str = "keyword") -> Dict[str, Any]:
+    """Answer from ranked retrieval hits, or the help message if none is confident enough"""
+    campus_data = kb.data
+    match_path, label, min_score, min_lead_score = RANKED_MODES[mode]
+    # Off-topic questions score close to several unrelated answers at once, so
+    # a weak top hit must also stand clear of the runner-up
+    if (ranked and ranked[0][1] >= min_score()
+            and ranked[0][1] + ranked_lead(ranked, campus_data) >= min_lead_score()):
+        doc_kind, key = ranked[0][0].split(":", 1)
+        if doc_kind == "faq":
+            return {
+                "answer": campus_data["faqs"][key],
+                "source": f"CampusAI Knowledge Base ({label})",
+                "category": key,
+                "match_path": match_path
+            }
+        return {
+            "answer": campus_data["locations"][key],
+            "source": f"CampusAI Knowledge Base ({label})",
+            "category": "location",
+            "match_path": match_path
         }
     
     # Default response with helpful suggestions
@@ -179,51 +365,388 @@ def find_best_answer(query: str, conversation_context: dict = None) -> Dict[str,
                  "• Results and exams\n\n"
                  "Try asking: 'How do I pay school fees?' or 'What is MSRC?'",
         "source": "CampusAI",
-        "category": "help"
+        "category": "help",
+        "match_path": "fallback"
     }
 
+async def answer_question(query: str, conversation_context: dict, kb: KnowledgeBase, mode: str = None,
+                          campus: str = None) -> Dict[str, Any]:
+    """find_best_answer behind the answer cache, keyed on the normalized question, last category and mode"""
+    question = normalize_question(query)
+    last_category = (conversation_context or {}).get("last_category")
+    mode = mode or settings.retrieval_mode
+    result = answer_cache.get(kb.version, question, last_category, mode)
+    cached = result is not None
+    if not cached:
+        result, elapsed = await run_matcher(
+            find_best_answer, campus or settings.default_campus, kb,
+            question, conversation_context, mode=mode, timeout=settings.matcher_timeout
+        )
+        # Observed here, since in process mode find_best_answer ran in another process
+        metrics.match_latency.labels(result["match_path"]).observe(elapsed)
+        answer_cache.put(kb.version, question, last_category, result, mode)
+    metrics.answers.labels(result["match_path"], "true" if cached else "false").inc()
+    return result
+
+async def answer_questions(queries: List[str], conversation_contexts: List[dict], kb: KnowledgeBase,
+                           modes: List[str] = None, campus: str = None) -> List[Dict[str, Any]]:
+    """answer_question for a batch: cache hits are reused, misses are matched together once"""
+    modes = modes or [None] * len(queries)
+    keys = [
+        (normalize_question(query), (context or {}).get("last_category"), mode or settings.retrieval_mode)
+        for query, context, mode in zip(queries, conversation_contexts, modes)
+    ]
+    results = [answer_cache.get(kb.version, *key) for key in keys]
+    missing = {}
+    for i, result in enumerate(results):
+        if result is None:
+            missing.setdefault(keys[i], []).append(i)
+        else:
+            metrics.answers.labels(result["match_path"], "true").inc()
+    if missing:
+        unique = list(missing)
+        matched, elapsed = await run_matcher(
+            find_best_answers, campus or settings.default_campus, kb,
+            [question for question, _, _ in unique],
+            [conversation_contexts[missing[key][0]] for key in unique],
+            modes=[mode for _, _, mode in unique],
+            timeout=settings.matcher_batch_timeout
+        )
+        # One call matched them all, so each question is charged an equal share of its time
+        per_question = elapsed / len(unique)
+        for key, result in zip(unique, matched):
+            question, last_category, mode = key
+            metrics.match_latency.labels(result["match_path"]).observe(per_question)
+            answer_cache.put(kb.version, question, last_category, result, mode)
+            for i in missing[key]:
+                results[i] = result
+                metrics.answers.labels(result["match_path"], "false").inc()
+    return results
+
+def record_answer(question: str, result: Dict[str, Any], latency: float, conversation_id: str, campus: str,
+                  conversation_context: dict = None):
+    """Log an answered question and count its conversation's move between categories"""
+    category = result.get("category")
+    query_log.record(question, category, result["match_path"], latency, conversation_id, campus)
+    graph = related_graph(campus)
+    if graph is not None:
+        graph.observe((conversation_context or {}).get("last_category"), category)
+
+def build_response(result: Dict[str, Any], conversation_id: str, kb: KnowledgeBase,
+                   campus: str = None) -> AnswerResponse:
+    """Wrap a matcher result with its conversation id and related topics"""
+    related = get_related_topics(result.get("category", ""), kb, campus)
+    return AnswerResponse(
+        answer=result["answer"],
+        source=result["source"],
+        conversation_id=conversation_id,
+        related_topics=related if related else None,
+        kb_version=kb.version,
+        campus=campus or settings.default_campus
+    )
+
 @router.post("/ask", response_model=AnswerResponse)
 async def ask_question(request: QuestionRequest):
     """Answer campus-related questions with follow-up context support"""
     
+    start = time.perf_counter()
     # Get or create conversation ID
     conversation_id = request.conversation_id or str(uuid.uuid4())
     
-    # Get conversation context
-    conversation_context = conversations.get(conversation_id, {})
+    async with admitted(caller_key(request)):
+        # Pin one knowledge base version of the campus for the whole request
+        campus, kb = await campus_knowledge(request.campus)
+        
+        # Get conversation context
+        key = conversation_key(campus, conversation_id)
+        conversation_context = conversations.get(key)
+        
+        # Find answer with context
+        result = await answer_question(request.question, conversation_context, kb, request.retrieval_mode, campus)
+        
+        # Update conversation memory
+        conversations.put(key, result.get("category"))
     
-    # Find answer with context
-    result = find_best_answer(request.question, conversation_context)
+    record_answer(request.question, result, time.perf_counter() - start, conversation_id, campus,
+                  conversation_context)
+    return build_response(result, conversation_id, kb, campus)
+
+STREAM_MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+def answer_chunks(answer: str, chunk_chars: int = 48):
+    """Split an answer into word-aligned chunks of roughly chunk_chars characters"""
+    chunk = ""
+    for word in re.findall(r"\S+\s*|\s+", answer):
+        chunk += word
+        if len(chunk) >= chunk_chars:
+            yield chunk
+            chunk = ""
+    if chunk:
+        yield chunk
+
+def format_event(event: str, data: dict, fmt: str) -> str:
+    """Encode one stream event as a server-sent event or an NDJSON line"""
+    payload = json.dumps(data, ensure_ascii=False)
+    if fmt == "ndjson":
+        return f'{{"event": "{event}", "data": {payload}}}\n'
+    return f"event: {event}\ndata: {payload}\n\n"
+
+@router.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest, format: str = "sse"):
+    """Stream an answer as chunks, then related topics, then metadata (SSE or NDJSON)"""
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'sse' or 'ndjson'")
     
-    # Update conversation memory
-    conversations[conversation_id] = {
-        "last_question": request.question,
-        "last_category": result.get("category"),
-        "last_answer": result["answer"]
-    }
+    start = time.perf_counter()
+    conversation_id = request.conversation_id or str(uuid.uuid4())
+    # The slot covers matching only; streaming the finished answer holds none
+    async with admitted(caller_key(request)):
+        campus, kb = await campus_knowledge(request.campus)
+        key = conversation_key(campus, conversation_id)
+        conversation_context = conversations.get(key)
+        result = await answer_question(request.question, conversation_context, kb, request.retrieval_mode, campus)
+        conversations.put(key, result.get("category"))
+    record_answer(request.question, result, time.perf_counter() - start, conversation_id, campus,
+                  conversation_context)
+    response = build_response(result, conversation_id, kb, campus)
     
-    # Get related topics
-    related = get_related_topics(result.get("category", ""))
+    async def events():
+        for chunk in answer_chunks(response.answer):
+            yield format_event("answer", {"text": chunk}, format)
+            # Let the server flush each chunk to the client as it is produced
+            await asyncio.sleep(0)
+        yield format_event("related", {"related_topics": response.related_topics or []}, format)
+        yield format_event("meta", {
+            "conversation_id": response.conversation_id,
+            "source": response.source,
+            "kb_version": response.kb_version,
+            "campus": response.campus
+        }, format)
+        yield format_event("done", {}, format)
     
-    return AnswerResponse(
-        answer=result["answer"],
-        source=result["source"],
-        conversation_id=conversation_id,
-        related_topics=related if related else None
+    return StreamingResponse(
+        events(),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-@router.get("/categories")
-async def get_categories():
-    """Get all available question categories"""
+@router.post("/ask/batch", response_model=List[AnswerResponse])
+async def ask_batch(requests: List[QuestionRequest], http_request: Request):
+    """Answer many questions in one call; turns of the same conversation are applied in order"""
+    # Every question is charged to the caller's bucket, so a batch can be no larger than its burst
+    max_questions = int(min(settings.batch_max_questions, admission.buckets.max_cost))
+    if len(requests) > max_questions:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {max_questions} questions per batch"
+        )
+    # One slot for the whole batch, charged per question to the calling client
+    async with admitted(client_key(http_request), cost=len(requests)):
+        return await answer_batch(requests)
+
+async def answer_batch(requests: List[QuestionRequest]) -> List[AnswerResponse]:
+    # Pin one knowledge base version per campus for the whole batch
+    campus_ids = [request.campus or settings.default_campus for request in requests]
+    kbs = {}
+    for campus in dict.fromkeys(campus_ids):
+        kbs[campus] = (await campus_knowledge(campus))[1]
+    conversation_ids = [request.conversation_id or str(uuid.uuid4()) for request in requests]
+    keys = [conversation_key(campus, cid) for campus, cid in zip(campus_ids, conversation_ids)]
+    
+    # Group items by their turn number within their conversation: every item in a
+    # wave has its context ready, so each wave is matched as one batch per campus
+    waves: List[List[int]] = []
+    turns: Dict[str, int] = {}
+    for i, key in enumerate(keys):
+        turn = turns.get(key, 0)
+        turns[key] = turn + 1
+        if turn == len(waves):
+            waves.append([])
+        waves[turn].append(i)
+    
+    results: List[Dict[str, Any]] = [None] * len(requests)
+    for wave in waves:
+        by_campus: Dict[str, List[int]] = {}
+        for i in wave:
+            by_campus.setdefault(campus_ids[i], []).append(i)
+        for campus, items in by_campus.items():
+            start = time.perf_counter()
+            contexts = [conversations.get(keys[i]) for i in items]
+            matched = await answer_questions(
+                [requests[i].question for i in items], contexts, kbs[campus],
+                [requests[i].retrieval_mode for i in items], campus
+            )
+            # Items matched together share the call's time equally
+            latency = (time.perf_counter() - start) / len(items)
+            for i, result, context in zip(items, matched, contexts):
+                results[i] = result
+                conversations.put(keys[i], result.get("category"))
+                record_answer(requests[i].question, result, latency, conversation_ids[i], campus, context)
+    
+    return [
+        build_response(result, conversation_id, kbs[campus], campus)
+        for result, conversation_id, campus in zip(results, conversation_ids, campus_ids)
+    ]
+
+def socket_error(status: int, detail: str, retry_after: Optional[str] = None) -> dict:
+    error = {"error": detail, "status": status}
+    if retry_after is not None:
+        error["retry_after"] = int(retry_after)
+    return error
+
+async def socket_turn(text: str, campus: str, conversation_id: str, conversation_context: dict,
+                      rate_key: str) -> Tuple[dict, Optional[str]]:
+    """Answer one question frame; returns the reply frame and the category it moved the conversation to"""
+    start = time.perf_counter()
+    if len(text) > settings.ws_max_message_chars:
+        return socket_error(413, f"Frames are limited to {settings.ws_max_message_chars} characters"), None
+    try:
+        frame = json.loads(text)
+    except ValueError:
+        frame = None
+    if not isinstance(frame, dict) or not isinstance(frame.get("question"), str):
+        return socket_error(422, 'Send frames like {"question": "..."}'), None
+    mode = frame.get("retrieval_mode")
+    if mode is not None and mode not in RANKED_MODES:
+        return socket_error(422, f"retrieval_mode must be one of {', '.join(RANKED_MODES)}"), None
+    question = frame["question"]
+    try:
+        async with admitted(rate_key):
+            campus, kb = await campus_knowledge(campus)
+            result = await answer_question(question, conversation_context, kb, mode, campus)
+    except HTTPException as e:
+        return socket_error(e.status_code, e.detail, (e.headers or {}).get("Retry-After")), None
+    record_answer(question, result, time.perf_counter() - start, conversation_id, campus, conversation_context)
+    return build_response(result, conversation_id, kb, campus).model_dump(), result.get("category")
+
+@router.websocket("/ws")
+async def chat_socket(websocket: WebSocket, campus: Optional[str] = None, conversation_id: Optional[str] = None,
+                      user_id: Optional[str] = None):
+    """One chat session per connection: {"question": ...} frames in, answer frames out.
+
+    The conversation's last category lives on the connection, so turns never
+    touch the conversation store; it is saved there on close so the session
+    can carry on over HTTP. Turns are answered one at a time and the next
+    frame is read only after the answer is sent, so a client sending faster
+    than it is answered is slowed down by the socket itself. After
+    ws_max_messages frames the server closes the connection (code 1008).
+    """
+    await websocket.accept()
+    try:
+        campus, _ = await campus_knowledge(campus)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail[:120])
+        return
+    conversation_id = conversation_id or str(uuid.uuid4())
+    key = conversation_key(campus, conversation_id)
+    conversation_context = conversations.get(key)
+    rate_key = f"user:{user_id}" if user_id else f"conversation:{conversation_id}"
+    socket_stats["open"] += 1
+    messages = 0
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), settings.ws_idle_timeout)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1000, reason="idle timeout")
+                break
+            if message["type"] == "websocket.disconnect":
+                break
+            messages += 1
+            if messages > settings.ws_max_messages:
+                socket_stats["capped"] += 1
+                await websocket.close(code=1008, reason="message limit reached, reconnect to continue")
+                break
+            if message.get("text") is None:
+                reply, category = socket_error(422, "Send text frames"), None
+            else:
+                reply, category = await socket_turn(
+                    message["text"], campus, conversation_id, conversation_context, rate_key
+                )
+            if category:
+                conversation_context = {"last_category": category}
+            await websocket.send_text(json.dumps(reply, ensure_ascii=False))
+            if "error" not in reply:
+                socket_stats["turns"] += 1
+    except WebSocketDisconnect:
+        pass
+    finally:
+        socket_stats["open"] -= 1
+        if conversation_context.get("last_category"):
+            conversations.put(key, conversation_context["last_category"])
+
+@router.get("/search")
+async def search_knowledge(q: str, k: int = Query(5, ge=1, le=50), campus: Optional[str] = None):
+    """Get the top-k knowledge base entries for a query with their BM25 scores"""
+    campus, kb = await campus_knowledge(campus)
     return {
-        "categories": list(campus_data["faqs"].keys()),
-        "total": len(campus_data["faqs"])
+        "campus": campus,
+        "query": q,
+        "results": [
+            {"id": doc_id, "score": round(score, 4)}
+            for doc_id, score in kb.retriever.search(q, k)
+        ],
+        "kb_version": kb.version
     }
 
-@router.get("/tips")
-async def get_tips():
-    """Get quick tips for FUTO freshers"""
+@router.get("/conversations/stats")
+async def get_conversation_stats():
+    """Get conversation store size, eviction and memory stats"""
+    return conversations.stats()
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get answer cache size and hit/miss counters"""
+    return answer_cache.stats()
+
+@router.get("/matcher/stats")
+async def get_matcher_stats():
+    """Get matcher pool mode, size, pending calls and rejections"""
+    return matcher.stats()
+
+@router.get("/admission/stats")
+async def get_admission_stats():
+    """Get admission limits, in-flight and waiting requests, and refusals"""
+    return admission.stats()
+
+@router.get("/query-log/stats")
+async def get_query_log_stats():
+    """Get query log file, queued records, and written/dropped counters"""
+    return query_log.stats()
+
+@router.get("/campuses")
+async def get_campuses():
+    """Get the campuses this deployment serves and which of them are loaded"""
     return {
-        "tips": campus_data["quick_tips"],
-        "campus": campus_data["general_info"]["campus_name"]
-    }
\ No newline at end of file
+        "campuses": campuses.available(),
+        **campuses.stats()
+    }
+
+def knowledge_body(name: str, kb: KnowledgeBase, build) -> PrecompressedJSON:
+    """The serialized body of a knowledge-only endpoint, kept on (and freed with) the version it was built from"""
+    body = kb.bodies.get(name)
+    if body is None:
+        body = kb.bodies[name] = PrecompressedJSON(build(), f"public, max-age={settings.knowledge_cache_max_age}")
+    return body
+
+@router.get("/categories")
+async def get_categories(http_request: Request, campus: Optional[str] = None):
+    """Get all available question categories (ETag, 304 and gzip/br supported)"""
+    campus, kb = await campus_knowledge(campus)
+    return knowledge_body("categories", kb, lambda: {
+        "campus": campus,
+        "categories": list(kb.data["faqs"].keys()),
+        "total": len(kb.data["faqs"]),
+        "kb_version": kb.version
+    }).response(http_request.headers)
+
+@router.get("/tips")
+async def get_tips(http_request: Request, campus: Optional[str] = None):
+    """Get quick tips for the campus's freshers (ETag, 304 and gzip/br supported)"""
+    campus, kb = await campus_knowledge(campus)
+    return knowledge_body("tips", kb, lambda: {
+        "tips": kb.data["quick_tips"],
+        "campus": kb.data["general_info"]["campus_name"],
+        "campus_id": campus,
+        "kb_version": kb.version
+    }).response(http_request.headers)
\ No newline at end of file
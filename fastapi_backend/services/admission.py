@@ -0,0 +1,177 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Optional
+
+from services import metrics
+
+
+class RateLimitedError(Exception):
+    """The caller's token bucket is empty"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class OverCapacityError(Exception):
+    """Every concurrency slot is taken and the wait queue is full or timed out"""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Server over capacity ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets: `rate` tokens per second, at most `burst` saved up.
+
+    Buckets are kept in an LRU bounded to max_keys; a key that was evicted
+    simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    @property
+    def max_cost(self) -> float:
+        """The largest cost a single acquire() can ever be charged"""
+        return float(self.burst) if self.rate > 0 else math.inf
+
+    def acquire(self, key: str, cost: float = 1.0):
+        """Take cost tokens from key's bucket or raise RateLimitedError"""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if cost > self.burst:
+            # Could never be paid; callers must refuse such requests up front (see max_cost)
+            raise ValueError(f"Cost {cost} exceeds the burst of {self.burst}")
+        if bucket[0] < cost:
+            raise RateLimitedError((cost - bucket[0]) / self.rate)
+        bucket[0] -= cost
+
+
+class ConcurrencyLimiter:
+    """At most `limit` requests in progress; up to max_waiting wait at most wait_timeout for a slot.
+
+    Requests beyond that are refused immediately instead of queueing, so the
+    ones admitted keep a short latency when traffic spikes.
+    """
+
+    def __init__(self, limit: int, max_waiting: int, wait_timeout: float):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def acquire(self):
+        if self.limit <= 0:
+            return
+        if self.in_flight < self.limit and not self.waiting:
+            self.in_flight += 1
+            return
+        if self.waiting >= self.max_waiting:
+            raise OverCapacityError("queue full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot straight to us, so in_flight is already counted
+            await asyncio.wait_for(waiter, self.wait_timeout)
+        except asyncio.TimeoutError:
+            raise OverCapacityError("queue timeout")
+        except asyncio.CancelledError:
+            # Cancelled just after being handed a slot: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        if self.limit <= 0:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionController:
+    """Token bucket per caller, then a global concurrency limit"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int, max_concurrent: int,
+                 max_waiting: int, wait_timeout: float):
+        self.buckets = TokenBucketLimiter(rate, burst, max_keys)
+        self.concurrency = ConcurrencyLimiter(max_concurrent, max_waiting, wait_timeout)
+        self.admitted = 0
+        self.rate_limited = 0
+        self.over_capacity = 0
+
+    @asynccontextmanager
+    async def admit(self, key: Optional[str], cost: float = 1.0):
+        """Hold a concurrency slot for the block; raises RateLimitedError or OverCapacityError.
+
+        A None key skips the per-caller bucket and only takes a concurrency slot.
+        """
+        try:
+            if key is not None:
+                self.buckets.acquire(key, cost)
+        except RateLimitedError:
+            self.rate_limited += 1
+            metrics.admissions.labels("rate_limited").inc()
+            raise
+        start = time.perf_counter()
+        try:
+            await self.concurrency.acquire()
+        except OverCapacityError:
+            self.over_capacity += 1
+            metrics.admissions.labels("over_capacity").inc()
+            raise
+        self.admitted += 1
+        metrics.admissions.labels("admitted").inc()
+        metrics.admission_wait.observe(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            self.concurrency.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.concurrency.in_flight,
+            "waiting": self.concurrency.waiting,
+            "max_concurrent": self.concurrency.limit,
+            "max_waiting": self.concurrency.max_waiting,
+            "rate_per_second": self.buckets.rate,
+            "burst": self.buckets.burst,
+            "tracked_callers": len(self.buckets),
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "over_capacity": self.over_capacity
+        }
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After takes whole seconds; never tell a client to retry in 0"""
+    return str(max(1, math.ceil(seconds)))
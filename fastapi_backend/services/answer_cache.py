@@ -0,0 +1,68 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase and keep only the words, so "How do I pay fees?" == "how do i pay  fees" """
+    return " ".join(_WORD_RE.findall(question.lower()))
+
+
+class AnswerCache:
+    """Bounded LRU cache of matcher results shared by every campus.
+
+    Keys are (knowledge base version, normalized question, last_category,
+    retrieval mode). Versions are content hashes, so each campus gets its own
+    entries and a reload never serves old answers: entries of a replaced
+    version are simply never looked up again and age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, version: str, question: str, last_category: Optional[str],
+            mode: str = "keyword") -> Optional[Dict[str, Any]]:
+        key = (version, question, last_category, mode)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, version: str, question: str, last_category: Optional[str], result: Dict[str, Any],
+            mode: str = "keyword"):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            key = (version, question, last_category, mode)
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
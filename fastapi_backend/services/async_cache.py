@@ -0,0 +1,99 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class AsyncTTLCache:
+    """Bounded TTL cache for async lookups with request coalescing (singleflight).
+
+    Concurrent get_or_load calls for the same key share one in-flight loader
+    call, so N simultaneous identical lookups cost one upstream request.
+    Results the caller marks as errors are cached for a shorter error_ttl.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors_cached = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Hashable, value: Any, ttl: float):
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float,
+                          error_ttl: float = 0.0, is_error: Optional[Callable[[Any], bool]] = None) -> Any:
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # The load runs as its own task, so cancelling whichever caller
+            # started it never cancels it for the callers coalesced onto it
+            inflight = asyncio.ensure_future(self._load(key, loader, ttl, error_ttl, is_error))
+            inflight.add_done_callback(_retrieve_exception)
+            self._inflight[key] = inflight
+        # shield: a cancelled waiter must not cancel the shared call
+        return await asyncio.shield(inflight)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float,
+                    error_ttl: float, is_error: Optional[Callable[[Any], bool]]) -> Any:
+        try:
+            value = await loader()
+        finally:
+            self._inflight.pop(key, None)
+        if is_error is not None and is_error(value):
+            self.errors_cached += 1
+            self._store(key, value, error_ttl)
+        else:
+            self._store(key, value, ttl)
+        return value
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors_cached": self.errors_cached,
+            "inflight": len(self._inflight)
+        }
+
+
+def _retrieve_exception(task: asyncio.Future):
+    # Mark a failed load's exception as retrieved in case every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from services.knowledge_base import KnowledgeBaseManager
+
+logger = logging.getLogger(__name__)
+
+# Campus ids become file names, so keep them to a safe alphabet
+CAMPUS_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class CampusRegistry:
+    """Knowledge bases of many campuses, loaded on first use and evicted LRU by size.
+
+    Campus `<id>` is served from `<campuses_dir>/<id>.json` (and the artifact
+    `<id>.kbc` next to it, when present). Resident campuses are kept under
+    max_bytes of estimated memory; the least recently used one is dropped
+    first. The default campus is always resident. Requests that already
+    pinned an evicted campus's KnowledgeBase finish on it normally.
+    """
+
+    def __init__(self, default_campus: str, default_manager: KnowledgeBaseManager,
+                 campuses_dir: str, max_bytes: int):
+        self.default_campus = default_campus
+        self.default_manager = default_manager
+        self.campuses_dir = campuses_dir
+        self.max_bytes = max_bytes
+        self._resident: "OrderedDict[str, KnowledgeBaseManager]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def paths(self, campus: str):
+        return (os.path.join(self.campuses_dir, f"{campus}.json"),
+                os.path.join(self.campuses_dir, f"{campus}.kbc"))
+
+    def exists(self, campus: str) -> bool:
+        if campus == self.default_campus:
+            return True
+        return bool(CAMPUS_ID_RE.match(campus)) and os.path.isfile(self.paths(campus)[0])
+
+    def available(self) -> List[str]:
+        """Every campus that can be served, resident or not"""
+        campuses = {self.default_campus}
+        if os.path.isdir(self.campuses_dir):
+            for name in os.listdir(self.campuses_dir):
+                campus, ext = os.path.splitext(name)
+                if ext == ".json" and CAMPUS_ID_RE.match(campus):
+                    campuses.add(campus)
+        return sorted(campuses)
+
+    def peek(self, campus: str) -> Optional[KnowledgeBaseManager]:
+        """The resident manager for campus (marking it recently used), or None"""
+        if campus == self.default_campus:
+            return self.default_manager
+        with self._lock:
+            manager = self._resident.get(campus)
+            if manager is not None:
+                self._resident.move_to_end(campus)
+            return manager
+
+    def get(self, campus: str) -> KnowledgeBaseManager:
+        """The manager for campus, loading it if needed (blocking; KeyError if unknown)"""
+        manager = self.peek(campus)
+        if manager is not None:
+            return manager
+        if not self.exists(campus):
+            raise KeyError(campus)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(campus, threading.Lock())
+        # One load per campus at a time; concurrent first requests wait for it
+        with load_lock:
+            manager = self.peek(campus)
+            if manager is not None:
+                return manager
+            manager = KnowledgeBaseManager(*self.paths(campus))
+            with self._lock:
+                self._resident[campus] = manager
+                self.loads += 1
+                self._evict()
+                self._load_locks.pop(campus, None)
+        logger.info("Campus %s loaded, version %s", campus, manager.current.version)
+        return manager
+
+    async def load(self, campus: str) -> KnowledgeBaseManager:
+        """get() that keeps cold loads (parsing and indexing) off the event loop"""
+        manager = self.peek(campus)
+        if manager is not None:
+            return manager
+        return await asyncio.to_thread(self.get, campus)
+
+    def _evict(self):
+        total = self.resident_bytes()
+        # The campus just loaded stays even if it alone exceeds the budget
+        while total > self.max_bytes and len(self._resident) > 1:
+            campus, manager = self._resident.popitem(last=False)
+            total -= manager.current.memory_bytes()
+            self.evictions += 1
+            logger.info("Campus %s evicted", campus)
+
+    def resident_bytes(self) -> int:
+        return sum(manager.current.memory_bytes() for manager in list(self._resident.values()))
+
+    def managers(self) -> Dict[str, KnowledgeBaseManager]:
+        with self._lock:
+            return {self.default_campus: self.default_manager, **self._resident}
+
+    async def watch(self, interval: float):
+        """Hot-reload every resident campus whose file changed"""
+        while True:
+            await asyncio.sleep(interval)
+            for campus, manager in self.managers().items():
+                if not manager.is_stale():
+                    continue
+                try:
+                    if await asyncio.to_thread(manager.reload):
+                        logger.info("Campus %s reloaded, version %s", campus, manager.current.version)
+                except Exception as e:
+                    # Keep serving the previous version (and watching) until the file is fixed
+                    logger.warning("Campus %s reload failed: %s: %s", campus, type(e).__name__, e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            resident = {campus: manager.current.memory_bytes() for campus, manager in self._resident.items()}
+        return {
+            "default_campus": self.default_campus,
+            "resident": len(resident) + 1,
+            "resident_bytes": sum(resident.values()),
+            "max_bytes": self.max_bytes,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "resident_campuses": resident
+        }
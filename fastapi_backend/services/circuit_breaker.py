@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast for reset_timeout seconds. Then up to half_open_max_calls trial
+    calls are let through: a success closes the circuit, a failure re-opens it.
+    A trial that ends any other way (cancelled, or an error that says nothing
+    about the upstream) hands its slot back through release_trial().
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        # Bumped on every half-open transition so a late release_trial() cannot free a newer trial's slot
+        self._half_opened = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial_calls = 0
+            self._half_opened += 1
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a trial call through"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def before_call(self) -> Optional[int]:
+        """Raise CircuitOpenError if the call must not reach the upstream.
+
+        Returns a token for half-open trial calls (None otherwise), to be
+        passed to release_trial() once the call is over, however it ended.
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return None
+            if self._state == HALF_OPEN and self._trial_calls < self.half_open_max_calls:
+                self._trial_calls += 1
+                return self._half_opened
+            self.rejected += 1
+            retry_after = self.reset_timeout - (time.monotonic() - self._opened_at) if self._state == OPEN else 1.0
+        raise CircuitOpenError(self.name, max(retry_after, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_calls = 0
+
+    def release_trial(self, token: Optional[int]):
+        """Free a trial slot that record_success() or record_failure() did not already settle"""
+        if token is None:
+            return
+        with self._lock:
+            if self._state == HALF_OPEN and token == self._half_opened and self._trial_calls > 0:
+                self._trial_calls -= 1
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_calls = 0
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "retry_after": round(self.retry_after(), 2),
+            "times_opened": self.opened,
+            "rejected_calls": self.rejected
+        }
@@ -0,0 +1,332 @@
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class ConversationRecord:
+    """Compact per-conversation state: the last answered category and when it was seen"""
+    __slots__ = ("category_id", "last_seen")
+
+    def __init__(self, category_id: int, last_seen: float):
+        self.category_id = category_id
+        self.last_seen = last_seen
+
+
+class ConversationStore:
+    """Interface for conversation context backends used by /chat/ask"""
+
+    def get(self, conversation_id: str) -> dict:
+        """Get the conversation context, or an empty dict if unknown or expired"""
+        raise NotImplementedError
+
+    def put(self, conversation_id: str, category: Optional[str]):
+        """Record the latest answered category for a conversation"""
+        raise NotImplementedError
+
+    def delete(self, conversation_id: str):
+        raise NotImplementedError
+
+    def __len__(self):
+        """Number of conversations held"""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources and persist anything still pending"""
+
+
+class MemoryConversationStore(ConversationStore):
+    """Bounded conversation context store with idle TTL and LRU eviction.
+
+    Entries are kept in an OrderedDict in least-recently-used order. Since every
+    access moves an entry to the end, the front is also the longest idle entry,
+    so both TTL expiry and LRU eviction only ever pop from the front.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 1800):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, ConversationRecord]" = OrderedDict()
+        self._categories: Dict[str, int] = {}
+        self._category_names = []
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _category_id(self, category: Optional[str]) -> int:
+        """Intern a category name; -1 stands for no category"""
+        if not category:
+            return -1
+        category_id = self._categories.get(category)
+        if category_id is None:
+            category_id = len(self._category_names)
+            self._categories[category] = category_id
+            self._category_names.append(category)
+        return category_id
+
+    def _expire(self, now: float):
+        entries = self._entries
+        while entries:
+            record = next(iter(entries.values()))
+            if now - record.last_seen < self.ttl_seconds:
+                break
+            entries.popitem(last=False)
+            self.expirations += 1
+
+    def get(self, conversation_id: str) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            record = self._entries.get(conversation_id)
+            if record is None:
+                return {}
+            record.last_seen = now
+            self._entries.move_to_end(conversation_id)
+            category_id = record.category_id
+        if category_id < 0:
+            return {}
+        return {"last_category": self._category_names[category_id]}
+
+    def put(self, conversation_id: str, category: Optional[str]):
+        now = time.monotonic()
+        with self._lock:
+            category_id = self._category_id(category)
+            record = self._entries.get(conversation_id)
+            if record is not None:
+                record.category_id = category_id
+                record.last_seen = now
+                self._entries.move_to_end(conversation_id)
+            else:
+                self._entries[conversation_id] = ConversationRecord(category_id, now)
+            self._expire(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, conversation_id: str):
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the store (container, keys and records)"""
+        with self._lock:
+            total = sys.getsizeof(self._entries)
+            for key, record in self._entries.items():
+                total += sys.getsizeof(key) + sys.getsizeof(record)
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "categories": len(self._category_names),
+            "memory_bytes": self.memory_bytes()
+        }
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversation context shared by every worker through a local SQLite file.
+
+    The database runs in WAL mode so readers in other workers never block the
+    writer. Writes are deferred: put() only updates the in-process cache and a
+    pending batch, which a background thread flushes in one transaction every
+    flush_interval seconds (or as soon as batch_size writes are queued). Reads
+    go through a small in-process cache whose entries are trusted for
+    cache_ttl seconds before SQLite is consulted again, so other workers'
+    updates become visible after at most flush_interval + cache_ttl.
+    """
+
+    def __init__(self, path: str = "conversations.db", ttl_seconds: float = 1800,
+                 cache_size: int = 10000, cache_ttl: float = 1.0,
+                 flush_interval: float = 0.25, batch_size: int = 256):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "id TEXT PRIMARY KEY, category TEXT, updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS conversations_updated_at ON conversations (updated_at)"
+        )
+        self._db_lock = threading.Lock()
+
+        # conversation_id -> (category, cached_at)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        # conversation_id -> (category, updated_at); None category marks a delete
+        self._pending: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self._last_purge = 0.0
+        # Row count as of the last purge; COUNT(*) scans the table, so it stays off the scrape path
+        self._size = 0
+
+        self._writer = threading.Thread(target=self._run_writer, name="conversation-writer", daemon=True)
+        self._writer.start()
+
+    def _cache_set(self, conversation_id: str, category: Optional[str], now: float):
+        self._cache[conversation_id] = (category, now)
+        self._cache.move_to_end(conversation_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, conversation_id: str) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(conversation_id)
+            if cached is not None and now - cached[1] < self.cache_ttl:
+                self.cache_hits += 1
+                category = cached[0]
+                return {"last_category": category} if category else {}
+            pending = self._pending.get(conversation_id)
+            self.cache_misses += 1
+        if pending is not None:
+            category = pending[0]
+        else:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT category FROM conversations WHERE id = ? AND updated_at >= ?",
+                    (conversation_id, time.time() - self.ttl_seconds)
+                ).fetchone()
+            category = row[0] if row else None
+        with self._lock:
+            self._cache_set(conversation_id, category, now)
+        return {"last_category": category} if category else {}
+
+    def put(self, conversation_id: str, category: Optional[str]):
+        with self._lock:
+            self._cache_set(conversation_id, category, time.monotonic())
+            self._pending[conversation_id] = (category or "", time.time())
+            pending = len(self._pending)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def delete(self, conversation_id: str):
+        with self._lock:
+            self._cache.pop(conversation_id, None)
+            self._pending[conversation_id] = (None, time.time())
+        self._wake.set()
+
+    def flush(self):
+        """Write every pending update to SQLite in a single transaction"""
+        with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+        upserts = [(cid, category, ts) for cid, (category, ts) in batch.items() if category is not None]
+        deletes = [(cid,) for cid, (category, _) in batch.items() if category is None]
+        with self._db_lock:
+            self._db.execute("BEGIN")
+            try:
+                if upserts:
+                    self._db.executemany(
+                        "INSERT INTO conversations (id, category, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET category = excluded.category, "
+                        "updated_at = excluded.updated_at",
+                        upserts
+                    )
+                if deletes:
+                    self._db.executemany("DELETE FROM conversations WHERE id = ?", deletes)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        self.flushes += 1
+        self.rows_written += len(batch)
+
+    def purge_expired(self):
+        """Delete conversations idle longer than the TTL and recount the rows left"""
+        with self._db_lock:
+            self._db.execute(
+                "DELETE FROM conversations WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._size = self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def _run_writer(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() - self._last_purge > 60:
+                    self._last_purge = time.monotonic()
+                    self.purge_expired()
+            except sqlite3.Error:
+                # Another worker holds the write lock for too long; retry next tick
+                pass
+
+    def __len__(self):
+        """Conversations in the database (every worker's) as of the writer's last purge, at most a minute old"""
+        return self._size
+
+    def stats(self) -> dict:
+        size = len(self)
+        with self._lock:
+            pending = len(self._pending)
+            cached = len(self._cache)
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": size,
+            "ttl_seconds": self.ttl_seconds,
+            "pending_writes": pending,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "cache_size": cached,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+
+
+def create_conversation_store(settings) -> ConversationStore:
+    """Build the conversation backend selected by settings.conversation_backend"""
+    if settings.conversation_backend == "sqlite":
+        return SQLiteConversationStore(
+            path=settings.conversation_db_path,
+            ttl_seconds=settings.conversation_ttl_seconds,
+            cache_size=settings.conversation_max_entries,
+            cache_ttl=settings.conversation_cache_ttl_seconds,
+            flush_interval=settings.conversation_flush_interval_seconds
+        )
+    if settings.conversation_backend != "memory":
+        raise ValueError(f"Unknown conversation backend: {settings.conversation_backend}")
+    return MemoryConversationStore(
+        max_entries=settings.conversation_max_entries,
+        ttl_seconds=settings.conversation_ttl_seconds
+    )
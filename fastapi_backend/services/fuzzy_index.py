@@ -0,0 +1,120 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def osa_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance (Levenshtein + adjacent transpositions).
+
+    Only the diagonal band that can stay within max_distance is computed, and
+    max_distance + 1 is returned as soon as the distance is known to exceed it.
+    """
+    # A shared prefix or suffix never changes the distance
+    while a and b and a[0] == b[0]:
+        a, b = a[1:], b[1:]
+    while a and b and a[-1] == b[-1]:
+        a, b = a[:-1], b[:-1]
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if not a or not b:
+        return max(len(a), len(b))
+    too_far = max_distance + 1
+    previous2 = None
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [i if i <= max_distance else too_far] + [too_far] * len(b)
+        low, high = max(1, i - max_distance), min(len(b), i + max_distance)
+        row_min = current[0]
+        for j in range(low, high + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return too_far
+        previous2, previous = previous, current
+    return min(previous[-1], too_far)
+
+
+def _deletes(word: str, max_distance: int) -> set:
+    """Every string reachable from word by deleting up to max_distance characters"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w)) if len(w) > 1}
+        results |= frontier
+    return results
+
+
+class FuzzyIndex:
+    """SymSpell-style symmetric deletion dictionary over the keyword vocabulary.
+
+    All deletions (up to max_distance) of every vocabulary word are precomputed
+    at build time. A lookup only generates the deletions of the query word and
+    verifies the few candidates that share one, instead of computing the edit
+    distance against every keyword.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], known_words: Iterable[str] = (), max_distance: int = 2):
+        self.max_distance = max_distance
+        self.vocabulary: Dict[str, int] = {}
+        for word in vocabulary:
+            self.vocabulary.setdefault(word, len(self.vocabulary))
+        # Words that are spelled correctly even though they are not keywords
+        self.known_words = set(known_words) | set(self.vocabulary)
+        self._deletes: Dict[str, List[str]] = {}
+        for word in self.vocabulary:
+            for variant in _deletes(word, max_distance):
+                self._deletes.setdefault(variant, []).append(word)
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    @staticmethod
+    def allowed_distance(word: str, max_distance: int) -> int:
+        """Short words get no (or little) tolerance, or "clean" would become "clear" """
+        if len(word) < 6:
+            return 0
+        return min(max_distance, 1 if len(word) < 9 else 2)
+
+    def lookup(self, word: str, max_distance: int) -> Optional[Tuple[str, int]]:
+        """Closest vocabulary word within max_distance, as (word, distance)"""
+        if word in self.vocabulary:
+            return word, 0
+        max_distance = min(max_distance, self.max_distance)
+        best = None
+        seen = set()
+        for variant in _deletes(word, max_distance):
+            for candidate in self._deletes.get(variant, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = osa_distance(word, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                rank = (distance, self.vocabulary[candidate])
+                if best is None or rank < best[0]:
+                    best = (rank, candidate)
+        if best is None:
+            return None
+        return best[1], best[0][0]
+
+    def correct(self, text: str, max_distance: int) -> Tuple[str, List[Tuple[str, str]]]:
+        """Replace misspelled words with their closest keyword; returns (text, [(typo, fix)])"""
+        words = _WORD_RE.findall(text.lower())
+        corrections = []
+        for i, word in enumerate(words):
+            if word in self.known_words:
+                continue
+            allowed = self.allowed_distance(word, max_distance)
+            if not allowed:
+                continue
+            match = self.lookup(word, allowed)
+            if match is not None:
+                words[i] = match[0]
+                corrections.append((word, match[0]))
+        return " ".join(words), corrections
@@ -0,0 +1,93 @@
+from collections import deque, namedtuple
+from typing import Dict, List
+
+# A single keyword hit inside a query
+Match = namedtuple("Match", ["start", "end", "keyword", "kind", "value", "priority"])
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds every keyword hit in one pass over the text.
+
+    Matches are word-boundary aware: a keyword must start at the beginning of a
+    word, and whole-word keywords must also end at a word boundary. Prefix
+    keywords (the default) still match inflections, e.g. "fee" in "fees".
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._patterns = []
+        self._built = False
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def add(self, keyword: str, kind: str, value=None, priority: int = 0, whole_word: bool = False):
+        """Register a keyword; must be called before build()"""
+        if self._built:
+            raise RuntimeError("Cannot add keywords after the matcher is built")
+        keyword = keyword.lower()
+        if not keyword:
+            return
+        node = 0
+        for char in keyword:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self._patterns))
+        self._patterns.append((keyword, kind, value if value is not None else keyword, priority, whole_word))
+
+    def build(self):
+        """Compute failure links (breadth-first) and freeze the automaton"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        self._built = True
+        return self
+
+    def find_all(self, text: str) -> List[Match]:
+        """Return every word-boundary respecting hit, ranked best first"""
+        if not self._built:
+            self.build()
+        text = text.lower()
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        length = len(text)
+        hits = []
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in out[node]:
+                keyword, kind, value, priority, whole_word = patterns[index]
+                start = end - len(keyword) + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if whole_word and end + 1 < length and text[end + 1].isalnum():
+                    continue
+                hits.append(Match(start, end + 1, keyword, kind, value, priority))
+        hits.sort(key=lambda m: (-(m.end - m.start), -m.priority, m.start))
+        return hits
+
+    def find_by_kind(self, text: str) -> Dict[str, List[Match]]:
+        """Group ranked hits by kind (greeting, keyword, followup, ...)"""
+        grouped: Dict[str, List[Match]] = {}
+        for match in self.find_all(text):
+            grouped.setdefault(match.kind, []).append(match)
+        return grouped
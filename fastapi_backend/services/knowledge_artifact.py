@@ -0,0 +1,178 @@
+"""Precompiled knowledge base artifact.
+
+Parsing campus_knowledge.json and rebuilding the keyword automaton, BM25
+index and semantic vectors on every cold start is wasted work, so this module
+compiles them once into a versioned binary file:
+
+    magic | header length | JSON header | pickled objects | aligned numpy arrays
+
+The header records the SHA-256 of the source JSON, and a fingerprint of the
+code that builds and unpickles the indexes, so an artifact from another
+file or another version of the code is never served. Arrays are exposed straight from a read-only memory map, which
+keeps them in the shared page cache instead of each worker's private heap.
+
+Build it with:
+
+    python -m services.knowledge_artifact build
+    python -m services.knowledge_artifact bench   # cold start time / RSS, JSON vs artifact
+"""
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+from contextlib import suppress
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_MAGIC = b"CAKBART\0"
+ARTIFACT_FORMAT = 4
+ALIGNMENT = 64
+
+_PREFIX = struct.Struct("<8sII")  # magic, format version, header length
+
+
+# Modules whose classes are pickled into the artifact or shape its arrays
+_FINGERPRINT_MODULES = (
+    "keyword_matcher.py", "fuzzy_index.py", "retrieval.py", "semantic.py",
+    "knowledge_base.py", "knowledge_artifact.py"
+)
+
+
+@lru_cache(maxsize=1)
+def code_fingerprint() -> str:
+    """SHA-256 over the source of the modules above, so any change to them invalidates artifacts"""
+    digest = hashlib.sha256(str(ARTIFACT_FORMAT).encode())
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in _FINGERPRINT_MODULES:
+        with suppress(OSError):
+            with open(os.path.join(directory, name), "rb") as f:
+                digest.update(name.encode() + b"\0" + f.read())
+    return digest.hexdigest()[:16]
+
+
+def _pad(offset: int) -> int:
+    return (ALIGNMENT - offset % ALIGNMENT) % ALIGNMENT
+
+
+def write_artifact(path: str, source_sha256: str, objects: dict, arrays: Dict[str, np.ndarray]):
+    """Write the artifact atomically (temp file + rename)"""
+    blob = pickle.dumps(objects, protocol=pickle.HIGHEST_PROTOCOL)
+    sections = {}
+    payload = [blob]
+    offset = len(blob)
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        padding = _pad(offset)
+        payload.append(b"\0" * padding)
+        offset += padding
+        sections[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        payload.append(array.tobytes())
+        offset += array.nbytes
+
+    header = {
+        "source_sha256": source_sha256,
+        "code_fingerprint": code_fingerprint(),
+        "objects_length": len(blob),
+        "arrays": sections
+    }
+    header_bytes = json.dumps(header).encode()
+    # Pad the header so the data section itself starts aligned
+    header_bytes += b" " * _pad(_PREFIX.size + len(header_bytes))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(ARTIFACT_MAGIC, ARTIFACT_FORMAT, len(header_bytes)))
+        f.write(header_bytes)
+        for chunk in payload:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path: str, source_sha256: Optional[str] = None) -> Optional[Tuple[dict, Dict[str, np.ndarray]]]:
+    """Map an artifact into memory; None if it is missing, stale, corrupt or built by other code"""
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        return _decode(mapped, source_sha256)
+    except Exception as e:
+        # Truncated or corrupt file: the caller rebuilds from JSON instead
+        logger.warning("Ignoring unreadable knowledge artifact %s: %s: %s", path, type(e).__name__, e)
+        return None
+
+
+def _decode(mapped: mmap.mmap, source_sha256: Optional[str]) -> Optional[Tuple[dict, Dict[str, np.ndarray]]]:
+    if len(mapped) < _PREFIX.size:
+        return None
+    magic, version, header_length = _PREFIX.unpack_from(mapped, 0)
+    if magic != ARTIFACT_MAGIC or version != ARTIFACT_FORMAT:
+        return None
+    start = _PREFIX.size + header_length
+    header = json.loads(mapped[_PREFIX.size:start])
+    if header.get("code_fingerprint") != code_fingerprint():
+        return None
+    if source_sha256 is not None and header["source_sha256"] != source_sha256:
+        return None
+
+    objects = pickle.loads(mapped[start:start + header["objects_length"]])
+    arrays = {}
+    for name, section in header["arrays"].items():
+        dtype = np.dtype(section["dtype"])
+        count = int(np.prod(section["shape"])) if section["shape"] else 1
+        array = np.frombuffer(mapped, dtype=dtype, count=count, offset=start + section["offset"])
+        arrays[name] = array.reshape(section["shape"])
+    return objects, arrays
+
+
+def _measure(path: str, artifact_path: Optional[str]) -> dict:
+    """Time a fresh load in a child process and report its peak RSS"""
+    import subprocess
+    import sys
+
+    code = (
+        "import resource, time, json\n"
+        "from services.knowledge_base import KnowledgeBase\n"
+        "start = time.perf_counter()\n"
+        f"kb = KnowledgeBase.from_file({path!r}, {artifact_path!r})\n"
+        "elapsed = time.perf_counter() - start\n"
+        "rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "print(json.dumps({'source': kb.source, 'load_ms': round(elapsed * 1000, 2), 'max_rss_kb': rss}))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout)
+
+
+def main(argv=None):
+    from config import settings
+    from services.knowledge_base import KnowledgeBase
+
+    parser = argparse.ArgumentParser(description="Compile campus_knowledge.json into a binary artifact")
+    parser.add_argument("command", choices=["build", "bench"])
+    parser.add_argument("--source", default=settings.knowledge_base_path)
+    parser.add_argument("--output", default=settings.knowledge_artifact_path)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        kb = KnowledgeBase.from_file(args.source)
+        kb.write_artifact(args.output)
+        size = os.path.getsize(args.output)
+        print(f"Wrote {args.output} ({size} bytes) for knowledge base version {kb.version}")
+    else:
+        print(json.dumps({
+            "json": _measure(args.source, None),
+            "artifact": _measure(args.source, args.output)
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
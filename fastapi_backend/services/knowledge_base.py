@@ -0,0 +1,324 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import suppress
+from typing import Dict, Optional, Tuple
+
+from services.fuzzy_index import FuzzyIndex
+from services.keyword_matcher import KeywordMatcher
+from services.knowledge_artifact import read_artifact, write_artifact
+from services.related_topics import RelatedTopicsGraph
+from services.retrieval import BM25Index, build_retriever
+from services.semantic import SemanticIndex, build_semantic_index
+
+logger = logging.getLogger(__name__)
+
+# Greetings are matched as whole words so "this" no longer counts as "hi"
+GREETINGS = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening", "greetings"]
+
+# Enhanced keyword mapping (keyword -> FAQ key)
+KEYWORD_MAP = {
+    "fee": "fees",
+    "payment": "fees",
+    "pay": "fees",
+    "school fees": "school_fees",
+    "portal": "portal",
+    "website": "portal",
+    "clearance": "clearance",
+    "clear": "clearance",
+    "lecture": "lecture_hall",
+    "class": "class",
+    "hall": "lecture_hall",
+    "timetable": "timetable",
+    "schedule": "timetable",
+    "time table": "timetable",
+    "group chat": "group_chat",
+    "whatsapp": "group_chat",
+    "telegram": "group_chat",
+    "msrc": "msrc",
+    "student rep": "student_representative",
+    "representative": "student_representative",
+    "department": "department",
+    "dept": "dept",
+    "software": "software_engineering",
+    "registration": "registration",
+    "register": "registration",
+    "hostel": "hostel",
+    "accommodation": "hostel",
+    "library": "library",
+    "id card": "id_card",
+    "student id": "id_card",
+    "result": "result",
+    "grade": "result",
+    "exam": "exam",
+    "test": "exam",
+    "attendance": "attendance",
+    "course adviser": "course_adviser",
+    "adviser": "course_adviser",
+    "gmail": "gmail",
+    "email": "email",
+    "ict": "ict"
+}
+
+# Follow-up question patterns (intent -> trigger phrases)
+FOLLOWUP_PATTERNS = {
+    "where": ["location", "find it", "located", "place"],
+    "how": ["do i", "can i", "to get", "process"],
+    "what": ["is it", "does it", "mean", "about"],
+    "who": ["contact", "ask", "person"],
+    "when": ["time", "open", "available"]
+}
+
+TIPS_KEYWORDS = ["tip", "advice"]
+
+def build_followup_table(data: dict) -> Dict[Tuple[str, str], str]:
+    """Compile the file's "followup_rules" (last category -> intent -> FAQ key) into one flat lookup"""
+    table = {}
+    followup_rules = data.get("followup_rules", {})
+    if not isinstance(followup_rules, dict):
+        raise ValueError('"followup_rules" must map categories to {intent: FAQ key} objects')
+    for last_category, rules in followup_rules.items():
+        if not isinstance(rules, dict):
+            raise ValueError(f"Follow-up rules for '{last_category}' must be an object of intent -> FAQ key")
+        for intent, target in rules.items():
+            if not isinstance(target, str):
+                raise ValueError(f"Follow-up rule '{last_category}' + '{intent}' must name an FAQ key")
+            if intent not in FOLLOWUP_PATTERNS:
+                raise ValueError(f"Follow-up rule for '{last_category}' has unknown intent '{intent}'")
+            if target not in data["faqs"]:
+                raise ValueError(f"Follow-up rule '{last_category}' + '{intent}' points to missing FAQ '{target}'")
+            table[(last_category, intent)] = target
+    return table
+
+def build_matcher(data: dict) -> KeywordMatcher:
+    """Compile every keyword table into a single automaton"""
+    matcher = KeywordMatcher()
+    for greeting in GREETINGS:
+        matcher.add(greeting, "greeting", whole_word=True)
+    # Earlier entries win ties between equally long keywords
+    for priority, (keyword, faq_key) in enumerate(reversed(list(KEYWORD_MAP.items()))):
+        matcher.add(keyword, "keyword", faq_key, priority=priority)
+    for intent, patterns in FOLLOWUP_PATTERNS.items():
+        matcher.add(intent, "question", intent, whole_word=True)
+        for pattern in patterns:
+            matcher.add(pattern, "followup", intent)
+    for location in data["locations"]:
+        for word in location.split("_"):
+            matcher.add(word, "location", location)
+    for keyword in TIPS_KEYWORDS:
+        matcher.add(keyword, "tips")
+    return matcher.build()
+
+def build_fuzzy_index(data: dict, max_distance: int = 2) -> FuzzyIndex:
+    """Deletion dictionary over the keyword vocabulary, for correcting typos like "timtable" """
+    vocabulary = []
+    for keyword in list(KEYWORD_MAP) + TIPS_KEYWORDS:
+        vocabulary.extend(keyword.split())
+    for location in data["locations"]:
+        vocabulary.extend(location.split("_"))
+    # Words used anywhere in the knowledge base are real words, never typos
+    text = " ".join(GREETINGS + [p for patterns in FOLLOWUP_PATTERNS.values() for p in patterns] + list(FOLLOWUP_PATTERNS))
+    text += " " + json.dumps(data, ensure_ascii=False)
+    known_words = set(re.findall(r"[a-z0-9]+", text.lower()))
+    return FuzzyIndex(vocabulary, known_words, max_distance)
+
+def build_related_map(data: dict) -> Dict[str, Tuple[str, ...]]:
+    """Topics each FAQ's answer mentions (by keyword), in order of mention.
+
+    These are the suggestions for a category before any conversation has
+    moved on from it; observed transitions rank ahead of them. FAQs with an
+    identical answer (aliases such as "dept" and "department") are skipped.
+    """
+    faqs = data["faqs"]
+    keywords = sorted(KEYWORD_MAP, key=len, reverse=True)
+    pattern = re.compile(r"\b(" + "|".join(re.escape(keyword) for keyword in keywords) + r")s?\b")
+    related = {}
+    for key, answer in faqs.items():
+        topics = []
+        for match in pattern.finditer(answer.lower()):
+            topic = KEYWORD_MAP[match.group(1)]
+            if topic != key and topic in faqs and topic not in topics and faqs[topic] != answer:
+                topics.append(topic)
+        related[key] = tuple(topics)
+    return related
+
+
+class KnowledgeBase:
+    """One immutable version of the knowledge base and everything derived from it"""
+
+    def __init__(self, data: dict, version: str, path: Optional[str] = None, mtime: float = 0.0,
+                 matcher: KeywordMatcher = None, retriever: BM25Index = None, source: str = "json",
+                 sha256: Optional[str] = None, fuzzy: FuzzyIndex = None, semantic: SemanticIndex = None,
+                 source_bytes: Optional[int] = None):
+        self.data = data
+        self.version = version
+        self.sha256 = sha256
+        self.path = path
+        self.mtime = mtime
+        self.source = source
+        self.loaded_at = time.time()
+        self.matcher = matcher or build_matcher(data)
+        self.retriever = retriever or build_retriever(data)
+        self.fuzzy = fuzzy or build_fuzzy_index(data)
+        self.semantic = semantic or build_semantic_index(data)
+        self.source_bytes = source_bytes
+        self._memory_bytes = None
+        self.related_map = build_related_map(data)
+        self.followups = build_followup_table(data)
+        # Serialized responses derived from this version (e.g. /chat/tips), built on first use
+        self.bodies: Dict[str, object] = {}
+
+    @classmethod
+    def from_file(cls, path: str, artifact_path: Optional[str] = None) -> "KnowledgeBase":
+        """Load a knowledge base file, preferring a precompiled artifact built from the same bytes"""
+        mtime = os.stat(path).st_mtime
+        with open(path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if artifact_path:
+            artifact = read_artifact(artifact_path, digest)
+            if artifact is not None:
+                try:
+                    kb = cls.from_artifact(*artifact, version=digest[:12], path=path, mtime=mtime)
+                except Exception as e:
+                    logger.warning("Ignoring knowledge artifact %s: %s: %s", artifact_path, type(e).__name__, e)
+                else:
+                    kb.source_bytes = len(raw)
+                    return kb
+        return cls(json.loads(raw), digest[:12], path, mtime, sha256=digest, source_bytes=len(raw))
+
+    @classmethod
+    def from_artifact(cls, objects: dict, arrays: dict, version: str,
+                      path: Optional[str] = None, mtime: float = 0.0) -> "KnowledgeBase":
+        """Assemble a knowledge base from a loaded artifact without rebuilding anything"""
+        retriever = BM25Index.from_arrays(
+            objects["bm25_doc_ids"], objects["bm25_vocab"],
+            arrays["bm25_indptr"], arrays["bm25_indices"], arrays["bm25_weights"]
+        )
+        semantic = SemanticIndex.from_arrays(objects["bm25_doc_ids"], {
+            name[len("semantic_"):]: array for name, array in arrays.items() if name.startswith("semantic_")
+        })
+        return cls(objects["data"], version, path, mtime, matcher=objects["matcher"],
+                   retriever=retriever, source="artifact", sha256=objects["sha256"], fuzzy=objects["fuzzy"],
+                   semantic=semantic)
+
+    def write_artifact(self, artifact_path: str):
+        """Compile this version and its indexes into a binary artifact"""
+        objects = {
+            "sha256": self.sha256,
+            "data": self.data,
+            "matcher": self.matcher,
+            "fuzzy": self.fuzzy,
+            "bm25_doc_ids": self.retriever.doc_ids,
+            "bm25_vocab": self.retriever.vocab
+        }
+        arrays = {
+            "bm25_indptr": self.retriever.indptr,
+            "bm25_indices": self.retriever.indices,
+            "bm25_weights": self.retriever.weights
+        }
+        arrays.update({f"semantic_{name}": array for name, array in self.semantic.arrays().items()})
+        write_artifact(artifact_path, self.sha256, objects, arrays)
+
+    def memory_bytes(self) -> int:
+        """Rough resident size: index arrays plus ~10x the JSON size for the Python objects.
+
+        The multiplier and fixed overhead were measured with tracemalloc on
+        synthetic knowledge bases; this only needs to be good enough to budget
+        how many campuses stay loaded.
+        """
+        if self._memory_bytes is None:
+            arrays = [self.retriever.indptr, self.retriever.indices, self.retriever.weights]
+            arrays.extend(self.semantic.arrays().values())
+            source_bytes = self.source_bytes
+            if source_bytes is None:
+                source_bytes = len(json.dumps(self.data, ensure_ascii=False).encode("utf-8"))
+            self._memory_bytes = sum(a.nbytes for a in arrays) + 10 * source_bytes + 256 * 1024
+        return self._memory_bytes
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "faqs": len(self.data["faqs"]),
+            "locations": len(self.data["locations"]),
+            "keywords": len(self.matcher),
+            "followup_rules": len(self.followups),
+            "fuzzy_vocabulary": len(self.fuzzy),
+            "semantic_dim": self.semantic.dim,
+            "semantic_ann": self.semantic.centroids is not None,
+            "memory_bytes": self.memory_bytes()
+        }
+
+
+class KnowledgeBaseManager:
+    """Holds the live KnowledgeBase and swaps in rebuilt versions atomically.
+
+    Readers grab `current` once per request and use only that object, so a
+    reload never changes the data under an in-flight request: it finishes on
+    the version it started with while new requests see the new one.
+    """
+
+    def __init__(self, path: str, artifact_path: Optional[str] = None):
+        self.path = path
+        self.artifact_path = artifact_path
+        self._reload_lock = threading.Lock()
+        self.current = KnowledgeBase.from_file(path, artifact_path)
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._failed_mtime = None
+        # Category transitions seen on this campus; kept across reloads, dropped with the manager
+        self.related = RelatedTopicsGraph()
+
+    def is_stale(self) -> bool:
+        """True if the file on disk changed since the live version (or last failed attempt)"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        return mtime != self.current.mtime and mtime != self._failed_mtime
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild from disk and swap it in; returns True if the version changed.
+
+        This parses and indexes the whole file, so call it off the event loop.
+        """
+        with self._reload_lock:
+            if not force and not self.is_stale():
+                return False
+            try:
+                fresh = KnowledgeBase.from_file(self.path, self.artifact_path)
+            except Exception as e:
+                # Any malformed file, not only bad JSON: remember it so it is not retried until it changes
+                self.last_error = f"{type(e).__name__}: {e}"
+                with suppress(OSError):
+                    self._failed_mtime = os.stat(self.path).st_mtime
+                raise
+            self.last_error = None
+            self._failed_mtime = None
+            if fresh.version == self.current.version:
+                self.current.mtime = fresh.mtime
+                return False
+            self.current = fresh
+            self.reloads += 1
+            return True
+
+    async def watch(self, interval: float):
+        """Poll the file mtime and reload in a worker thread whenever it changes"""
+        while True:
+            await asyncio.sleep(interval)
+            if not self.is_stale():
+                continue
+            try:
+                if await asyncio.to_thread(self.reload):
+                    logger.info("Knowledge base reloaded, version %s", self.current.version)
+            except Exception as e:
+                # Keep serving the previous version (and watching) until the file is fixed
+                logger.warning("Knowledge base reload failed: %s: %s", type(e).__name__, e)
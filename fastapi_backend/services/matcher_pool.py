@@ -0,0 +1,206 @@
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing import get_context
+from typing import Any, Callable, Optional, Tuple
+
+from services import metrics
+
+MODES = ("inline", "thread", "process")
+
+
+class PoolSaturatedError(Exception):
+    """Raised instead of queueing when every worker is busy and the queue is full"""
+
+    def __init__(self, pending: int, retry_after: float = 1.0):
+        super().__init__(f"Matcher pool saturated ({pending} requests pending)")
+        self.retry_after = retry_after
+
+
+class PoolBrokenError(PoolSaturatedError):
+    """Raised when a pool worker died; the pool is recreated for the next call"""
+
+    def __init__(self):
+        Exception.__init__(self, "Matcher pool worker died, restarting the pool")
+        self.retry_after = 1.0
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a matcher call did not finish (or start) before its deadline"""
+
+
+class VersionMismatchError(Exception):
+    """Raised by a resolver when a worker cannot load the knowledge base version the caller pinned"""
+
+
+# Set in each process pool worker by _init_worker
+_resolver: Optional[Callable] = None
+
+
+def _import(path: str):
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _init_worker(resolver: str, env: dict, warm: tuple):
+    """Process pool initializer: configure the worker and load the knowledge base once"""
+    global _resolver
+    # Must happen before the resolver's module reads config.settings
+    os.environ.update(env)
+    _resolver = _import(resolver)
+    if warm:
+        _resolver(*warm)
+
+
+def _run_in_worker(func: Callable, campus: str, version: str, args: tuple, kwargs: dict,
+                   submitted_at: float, deadline: float):
+    started = time.time()
+    if started > deadline:
+        raise DeadlineExceededError("Deadline passed while queued")
+    kb = _resolver(campus, version)
+    return _timed(func, args, kb, kwargs) + (started - submitted_at,)
+
+
+def _run_in_thread(func: Callable, kb, args: tuple, kwargs: dict, submitted_at: float, deadline: float):
+    started = time.time()
+    if started > deadline:
+        raise DeadlineExceededError("Deadline passed while queued")
+    return _timed(func, args, kb, kwargs) + (started - submitted_at,)
+
+
+def _timed(func: Callable, args: tuple, kb, kwargs: dict) -> tuple:
+    """(func(*args, kb=kb, **kwargs), seconds it ran)"""
+    start = time.perf_counter()
+    result = func(*args, kb=kb, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class MatcherPool:
+    """Runs matcher calls off the event loop, in a thread or process pool.
+
+    At most `workers` calls run at once and at most `queue_size` more wait;
+    beyond that run() fails fast with PoolSaturatedError instead of letting
+    latency grow without bound. Every call has a deadline: a call still
+    queued when it passes is skipped, and the caller stops waiting for one
+    that is still running.
+
+    In process mode the KnowledgeBase is not sent to the workers. Each worker
+    imports `resolver` ("module:function") once at start-up, which loads the
+    knowledge base in that process, and calls resolver(campus, version) to get
+    the version the request pinned. "inline" calls the matcher on the event
+    loop, as before.
+    """
+
+    def __init__(self, mode: str = "thread", workers: int = 4, queue_size: int = 64,
+                 resolver: Optional[str] = None, warm: tuple = ()):
+        if mode not in MODES:
+            raise ValueError(f"matcher executor must be one of {', '.join(MODES)}")
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
+        self.resolver = resolver
+        self.warm = warm
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def start(self):
+        if self.mode == "inline" or self._executor is not None:
+            return
+        if self.mode == "thread":
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="matcher")
+            return
+        # spawn, not fork: the parent runs an event loop and helper threads
+        env = {"MATCHER_EXECUTOR": "inline", "CONVERSATION_BACKEND": "memory", "KNOWLEDGE_RELOAD_INTERVAL": "0"}
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=get_context("spawn"),
+            initializer=_init_worker, initargs=(self.resolver, env, self.warm)
+        )
+        # Start every worker (and load its knowledge base) before serving requests
+        wait([self._executor.submit(time.sleep, 0.1) for _ in range(self.workers)])
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func: Callable, campus: str, kb, *args, timeout: float, **kwargs) -> Any:
+        """func(*args, kb=kb, **kwargs) in the pool, failing fast when saturated or past the deadline"""
+        result, _ = await self.run_timed(func, campus, kb, *args, timeout=timeout, **kwargs)
+        return result
+
+    async def run_timed(self, func: Callable, campus: str, kb, *args, timeout: float,
+                        **kwargs) -> Tuple[Any, float]:
+        """run(), plus how long func itself ran wherever the pool ran it.
+
+        Metrics recorded inside a process pool worker never reach this
+        process's registry, so callers record the returned time themselves.
+        """
+        if self.mode == "inline":
+            return _timed(func, args, kb, kwargs)
+        self.start()
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            metrics.matcher_rejections.labels("saturated").inc()
+            raise PoolSaturatedError(self.pending)
+        submitted_at = time.time()
+        deadline = submitted_at + timeout
+        try:
+            if self.mode == "process":
+                future = self._executor.submit(
+                    _run_in_worker, func, campus, kb.version, args, kwargs, submitted_at, deadline
+                )
+            else:
+                future = self._executor.submit(_run_in_thread, func, kb, args, kwargs, submitted_at, deadline)
+        except BrokenExecutor:
+            # A worker died while the pool was idle; the next call starts a fresh pool
+            self._broken()
+        # A call stays pending until the pool is done with it, even if its caller gave up
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: self._release(loop))
+        try:
+            result, elapsed, waited = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except (asyncio.TimeoutError, DeadlineExceededError):
+            # Drops the call if it has not started yet; a running one finishes unobserved
+            future.cancel()
+            self.timeouts += 1
+            metrics.matcher_rejections.labels("deadline").inc()
+            raise DeadlineExceededError(f"Matcher did not answer within {timeout}s")
+        except BrokenExecutor:
+            self._broken()
+        self.completed += 1
+        metrics.matcher_queue_wait.observe(waited)
+        return result, elapsed
+
+    def _broken(self):
+        self.close()
+        self.restarts += 1
+        metrics.matcher_rejections.labels("broken").inc()
+        raise PoolBrokenError()
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        # Runs on a pool thread; hand the update to the event loop that owns the counter
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._decrement)
+
+    def _decrement(self):
+        self.pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending": self.pending,
+            "busy_workers": min(self.pending, self.workers) if self.mode != "inline" else 0,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts
+        }
@@ -1,35 +1,191 @@
+import asyncio
+import time
 import httpx
 from config import settings
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.async_cache import AsyncTTLCache
+from services import metrics
+
+def is_error_result(result) -> bool:
+    """Failed lookups: our own error dicts and the Node service's {"success": false} replies"""
+    return isinstance(result, dict) and ("error" in result or result.get("success") is False)
 
 class OriginService:
     def __init__(self):
         self.base_url = settings.node_service_url
-    
+        self._client = None
+        # Whether the pooled client negotiates HTTP/2; False when h2 is not installed
+        self.http2 = False
+        self.requests = 0
+        self.errors = 0
+        self.breaker = CircuitBreaker(
+            "Node microservice",
+            failure_threshold=settings.node_breaker_failure_threshold,
+            reset_timeout=settings.node_breaker_reset_timeout
+        )
+        # Short-lived cache of proxied Origin lookups, with concurrent identical calls coalesced
+        self.cache = AsyncTTLCache(max_entries=settings.origin_cache_size)
+        # Last background probe result, served by /health without touching the network
+        self.last_health = None
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """One keep-alive connection pool shared by every call to the Node microservice"""
+        http2 = settings.node_http2
+        if http2:
+            try:
+                import h2  # noqa: F401  (installed by `pip install httpx[http2]`)
+            except ImportError:
+                http2 = False
+        self.http2 = http2
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            timeout=httpx.Timeout(settings.node_timeout, connect=settings.node_connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.node_max_connections,
+                max_keepalive_connections=settings.node_max_keepalive_connections,
+                keepalive_expiry=settings.node_keepalive_expiry
+            )
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the service also works outside the app lifespan (scripts, tests)
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    async def start(self):
+        """Open the shared client (called from the FastAPI lifespan)"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+
+    async def close(self):
+        """Close the shared client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get(self, path: str, timeout: float, use_breaker: bool = True, endpoint: str = None):
+        endpoint = endpoint or path
+        trial = None
+        if use_breaker:
+            try:
+                trial = self.breaker.before_call()
+            except CircuitOpenError:
+                metrics.origin_latency.labels(endpoint, "circuit_open").observe(0.0)
+                raise
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            response = await self.client.get(path, timeout=httpx.Timeout(timeout, connect=settings.node_connect_timeout))
+        except httpx.TransportError:
+            # Connection failures and timeouts mean the upstream is down, not that the call was bad
+            self.errors += 1
+            if use_breaker:
+                self.breaker.record_failure()
+            metrics.origin_latency.labels(endpoint, "transport_error").observe(time.perf_counter() - start)
+            raise
+        except Exception:
+            self.errors += 1
+            metrics.origin_latency.labels(endpoint, "error").observe(time.perf_counter() - start)
+            raise
+        else:
+            # Calls outside the breaker (the /health probe) must not open or close it
+            if use_breaker:
+                if response.status_code >= 500:
+                    # A 502/503 from the Node service is as much an outage as a refused connection
+                    self.errors += 1
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+        finally:
+            # A cancelled or otherwise failed trial must not keep the half-open slot forever
+            self.breaker.release_trial(trial)
+        metrics.origin_latency.labels(endpoint, str(response.status_code)).observe(time.perf_counter() - start)
+        return response.json()
+
+    def _unavailable(self, e: CircuitOpenError) -> dict:
+        return {"error": str(e), "circuit": "open", "retry_after": round(e.retry_after)}
+
     async def check_health(self):
         """Check if Node microservice is healthy"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/health", timeout=5.0)
-                return response.json()
+            return await self._get("/health", settings.node_health_timeout, use_breaker=False, endpoint="health")
         except Exception as e:
             return {"error": str(e), "connected": False}
-    
-    async def get_linked_socials(self):
-        """Get user's linked social accounts"""
+
+    async def probe(self) -> dict:
+        """Run one health check and cache the result with its timestamp and latency"""
+        started = time.perf_counter()
+        result = await self.check_health()
+        self.last_health = {
+            "connected": result.get("status") == "ok",
+            "checked_at": time.time(),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "detail": result
+        }
+        return self.last_health
+
+    async def probe_forever(self, interval: float):
+        """Background task: probe the Node service every interval seconds"""
+        while True:
+            await self.probe()
+            await asyncio.sleep(interval)
+
+    async def _fetch(self, path: str, timeout: float, endpoint: str):
+        """GET an Origin endpoint, turning upstream failures into an error dict"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/auth/socials")
-                return response.json()
+            return await self._get(path, timeout, endpoint=endpoint)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             return {"error": str(e)}
-    
+
+    async def _cached(self, key: tuple, ttl: float, path: str, timeout: float):
+        try:
+            return await self.cache.get_or_load(
+                key,
+                lambda: self._fetch(path, timeout, endpoint=key[0]),
+                ttl,
+                error_ttl=settings.origin_error_ttl,
+                is_error=is_error_result
+            )
+        except CircuitOpenError as e:
+            # Not cached: the circuit state changes on its own schedule
+            return self._unavailable(e)
+
+    async def get_linked_socials(self):
+        """Get user's linked social accounts"""
+        return await self._cached(("socials",), settings.origin_socials_ttl,
+                                  "/auth/socials", settings.node_socials_timeout)
+
     async def get_twitter_user(self, username: str):
         """Get Twitter user data"""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/twitter/user/{username}")
-                return response.json()
-        except Exception as e:
-            return {"error": str(e)}
+        return await self._cached(("twitter", username.lower()), settings.origin_twitter_ttl,
+                                  f"/twitter/user/{username}", settings.node_twitter_timeout)
+
+    def stats(self) -> dict:
+        """Connection pool and request counters for the shared client"""
+        stats = {
+            "base_url": self.base_url,
+            "open": self._client is not None and not self._client.is_closed,
+            "http2_enabled": self.http2,
+            "max_connections": settings.node_max_connections,
+            "max_keepalive_connections": settings.node_max_keepalive_connections,
+            "requests": self.requests,
+            "errors": self.errors,
+            "circuit": self.breaker.stats(),
+            "cache": self.cache.stats(),
+            "last_health": self.last_health
+        }
+        # httpx does not expose pool state publicly; read it from the httpcore pool when available
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+            stats["active_connections"] = stats["connections"] - stats["idle_connections"]
+        return stats
 
-origin_service = OriginService()
\ No newline at end of file
+origin_service = OriginService()
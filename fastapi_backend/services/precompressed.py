@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional
+
+from fastapi.responses import Response
+
+try:
+    import brotli  # optional: `pip install brotli`
+except ImportError:
+    brotli = None
+
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip", "identity")
+
+# Bodies this small are not worth the Content-Encoding overhead
+MIN_COMPRESS_BYTES = 256
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class PrecompressedJSON:
+    """A JSON body serialized and compressed once, served with strong ETags.
+
+    Every content coding is a different representation, so each variant gets
+    its own strong ETag ("<hash>", "<hash>-gzip", "<hash>-br"); an
+    If-None-Match carrying any of them is answered with 304, since they all
+    stand for the same content.
+    """
+
+    def __init__(self, payload: dict, cache_control: str):
+        identity = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(identity).hexdigest()[:32]
+        self.cache_control = cache_control
+        self.variants: Dict[str, bytes] = {"identity": identity}
+        if len(identity) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = gzip.compress(identity, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(identity, quality=11)
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.variants
+        }
+        self._tags = {etag.strip('"') for etag in self.etags.values()}
+
+    def negotiate(self, accept_encoding: Optional[str]) -> str:
+        accepted = _accepted(accept_encoding or "")
+        wildcard = accepted.get("*", 0.0)
+        for encoding in ENCODINGS:
+            if encoding in self.variants and accepted.get(encoding, wildcard) > 0:
+                return encoding
+        return "identity"
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            # If-None-Match uses the weak comparison, so W/ tags match too
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"') in self._tags:
+                return True
+        return False
+
+    def response(self, headers) -> Response:
+        """The 304 or the negotiated variant for a request's headers"""
+        encoding = self.negotiate(headers.get("accept-encoding"))
+        response_headers = {
+            "ETag": self.etags[encoding],
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if self.not_modified(headers.get("if-none-match")):
+            return Response(status_code=304, headers=response_headers)
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type="application/json", headers=response_headers)
@@ -0,0 +1,217 @@
+"""Append-only log of every answered question, for finding knowledge base gaps.
+
+Requests only append a tuple to an in-memory queue; a background thread
+drains it in batches and writes one compact JSON object per line:
+
+    {"ts": 1718000000.123, "q": "...", "cat": "help", "path": "fallback", "ms": 1.2, "cid": "...", "campus": "futo"}
+
+Each process writes its own `queries-<start time>-<pid>.ndjson` file in the
+log directory and starts a new one once it reaches max_bytes or is
+rotate_seconds old. When the queue is full new records are dropped (and
+counted) rather than slowing requests down.
+
+Analyze the logs offline with:
+
+    python -m services.query_log analyze                 # every file in QUERY_LOG_DIR
+    python -m services.query_log analyze a.ndjson b.ndjson.gz --top 50
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Iterable, Iterator, List, Optional
+
+from services.answer_cache import normalize_question
+
+
+class QueryLog:
+    """Batched, non-blocking writer of query records (disabled when directory is empty)"""
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, rotate_seconds: float = 3600,
+                 flush_interval: float = 1.0, batch_size: int = 1024, max_pending: int = 100000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.enabled = bool(directory)
+
+        self._pending: Deque[tuple] = deque()
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._file = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+
+        self.records_written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.write_errors = 0
+        self._writer: Optional[threading.Thread] = None
+
+    def record(self, question: str, category: Optional[str], match_path: str, latency: float,
+               conversation_id: Optional[str], campus: Optional[str] = None):
+        """Queue one record; never blocks or touches the disk"""
+        if not self.enabled or self._closed:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((time.time(), question, category, match_path, latency, conversation_id, campus))
+        if self._writer is None:
+            self._start()
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def _start(self):
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run_writer, name="query-log-writer", daemon=True)
+                self._writer.start()
+
+    def _open(self, now: float):
+        if self._file is not None:
+            self._file.close()
+            self.rotations += 1
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+        path = os.path.join(self.directory, f"queries-{stamp}-{os.getpid()}.ndjson")
+        sequence = 1
+        while os.path.exists(path):
+            # Rotated more than once within a second
+            path = os.path.join(self.directory, f"queries-{stamp}-{os.getpid()}-{sequence}.ndjson")
+            sequence += 1
+        self._file = open(path, "a", encoding="utf-8")
+        self._path = path
+        self._opened_at = now
+
+    def flush(self):
+        """Write everything queued so far, rotating the file first if it is due"""
+        with self._write_lock:
+            while self._pending:
+                lines = []
+                while self._pending and len(lines) < self.batch_size:
+                    ts, question, category, match_path, latency, cid, campus = self._pending.popleft()
+                    lines.append(json.dumps({
+                        "ts": round(ts, 3), "q": question, "cat": category, "path": match_path,
+                        "ms": round(latency * 1000, 2), "cid": cid, "campus": campus
+                    }, ensure_ascii=False, separators=(",", ":")))
+                now = time.time()
+                if (self._file is None or self._file.tell() >= self.max_bytes
+                        or now - self._opened_at >= self.rotate_seconds):
+                    self._open(now)
+                self._file.write("\n".join(lines) + "\n")
+                self._file.flush()
+                self.records_written += len(lines)
+
+    def _run_writer(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                # Disk full or directory gone: drop this batch, keep serving
+                self.write_errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "current_file": self._path,
+            "pending": len(self._pending),
+            "records_written": self.records_written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        try:
+            self.flush()
+        except OSError:
+            self.write_errors += 1
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def log_files(directory: str) -> List[str]:
+    """Every query log in directory, oldest first"""
+    return sorted(glob.glob(os.path.join(directory, "*.ndjson")) + glob.glob(os.path.join(directory, "*.ndjson.gz")))
+
+
+def read_records(paths: Iterable[str]) -> Iterator[dict]:
+    """Stream records from plain or gzipped log files, skipping truncated lines"""
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def analyze(records: Iterable[dict], top: int = 20) -> dict:
+    """Fallback rate, most common unanswered questions and traffic per category and match path"""
+    total = 0
+    fallbacks = 0
+    categories: Counter = Counter()
+    paths: Counter = Counter()
+    path_ms: Counter = Counter()
+    unanswered: Counter = Counter()
+    first = last = None
+    for record in records:
+        total += 1
+        path = record.get("path") or "unknown"
+        paths[path] += 1
+        path_ms[path] += record.get("ms") or 0.0
+        categories[record.get("cat") or "none"] += 1
+        if path == "fallback":
+            fallbacks += 1
+            unanswered[normalize_question(record.get("q") or "")] += 1
+        ts = record.get("ts")
+        if ts is not None:
+            first = ts if first is None else min(first, ts)
+            last = ts if last is None else max(last, ts)
+    return {
+        "records": total,
+        "from": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(first)) if first is not None else None,
+        "to": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(last)) if last is not None else None,
+        "fallback_rate": round(fallbacks / total, 4) if total else 0.0,
+        "top_unanswered": [{"question": q, "count": n} for q, n in unanswered.most_common(top)],
+        "categories": dict(categories.most_common()),
+        "match_paths": {
+            path: {"count": n, "mean_ms": round(path_ms[path] / n, 2)} for path, n in paths.most_common()
+        }
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    from config import settings
+
+    parser = argparse.ArgumentParser(description="Report coverage gaps from the query logs")
+    parser.add_argument("command", choices=["analyze"])
+    parser.add_argument("paths", nargs="*", help=f"log files (default: every log in {settings.query_log_dir})")
+    parser.add_argument("--top", type=int, default=20, help="unanswered questions to list")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or log_files(settings.query_log_dir)
+    print(json.dumps(analyze(read_records(paths), args.top), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Container, Dict, Iterable, List, Optional, Sequence
+
+
+class RelatedTopicsGraph:
+    """Category transitions observed in conversations, kept as a ranked adjacency list.
+
+    Categories are interned to small integer ids. Each node keeps its
+    neighbours' transition counts and a list of neighbours ordered by count,
+    which observe() repairs in place (one bubble step per overtaken
+    neighbour), so reading the top topics of a category never sorts.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._counts: List[Dict[int, int]] = []
+        self._ranked: List[List[int]] = []
+        self._positions: List[Dict[int, int]] = []
+        self._lock = threading.Lock()
+        self.transitions = 0
+
+    def _node(self, category: str) -> int:
+        node = self._ids.get(category)
+        if node is None:
+            node = self._ids[category] = len(self._names)
+            self._names.append(category)
+            self._counts.append({})
+            self._ranked.append([])
+            self._positions.append({})
+        return node
+
+    def observe(self, previous: str, current: str):
+        """Count one conversation moving from category previous to current"""
+        if not previous or not current or previous == current:
+            return
+        with self._lock:
+            source, target = self._node(previous), self._node(current)
+            counts, ranked, positions = self._counts[source], self._ranked[source], self._positions[source]
+            count = counts.get(target, 0) + 1
+            counts[target] = count
+            if count == 1:
+                positions[target] = len(ranked)
+                ranked.append(target)
+            i = positions[target]
+            while i > 0 and counts[ranked[i - 1]] < count:
+                ranked[i], ranked[i - 1] = ranked[i - 1], target
+                positions[ranked[i]] = i
+                i -= 1
+            positions[target] = i
+            self.transitions += 1
+
+    def related(self, category: str, answerable: Container[str], prior: Sequence[str] = (),
+                limit: int = 3) -> List[str]:
+        """Up to limit answerable topics, most frequent transitions first, then prior suggestions"""
+        topics: List[str] = []
+        node = self._ids.get(category)
+        if node is not None:
+            for neighbour in self._ranked[node]:
+                if len(topics) == limit:
+                    return topics
+                name = self._names[neighbour]
+                if name in answerable:
+                    topics.append(name)
+        for name in prior:
+            if len(topics) == limit:
+                break
+            if name not in topics and name in answerable:
+                topics.append(name)
+        return topics
+
+    def stats(self) -> dict:
+        return {
+            "categories": len(self._names),
+            "edges": sum(len(counts) for counts in self._counts),
+            "transitions": self.transitions
+        }
+
+
+def replay_transitions(records: Iterable[dict], graph_for: Callable[[str], Optional[RelatedTopicsGraph]],
+                       default_campus: str, max_conversations: int = 100000):
+    """Feed the category transitions in query log records, in log order, to each campus's graph
+
+    Campuses for which graph_for returns None are skipped.
+    """
+    last: "OrderedDict[tuple, str]" = OrderedDict()
+    for record in records:
+        cid, category = record.get("cid"), record.get("cat")
+        if not cid or not category:
+            continue
+        campus = record.get("campus") or default_campus
+        previous = last.pop((campus, cid), None)
+        if previous is not None:
+            graph = graph_for(campus)
+            if graph is not None:
+                graph.observe(previous, category)
+        last[(campus, cid)] = category
+        if len(last) > max_conversations:
+            last.popitem(last=False)
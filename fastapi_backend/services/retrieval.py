@@ -0,0 +1,152 @@
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "about", "after", "all", "also", "am", "an", "and", "any", "are", "as", "at", "be", "been",
+    "before", "being", "but", "by", "can", "could", "did", "do", "does", "for", "from", "get", "go",
+    "had", "has", "have", "he", "her", "here", "him", "his", "how", "i", "if", "in", "into", "is",
+    "it", "its", "just", "let", "me", "might", "more", "most", "must", "my", "no", "not", "now", "of",
+    "on", "only", "or", "our", "out", "over", "shall", "she", "should", "so", "some", "such", "than",
+    "that", "the", "their", "them", "then", "there", "these", "they", "this", "those", "though", "to",
+    "too", "up", "us", "very", "was", "we", "were", "what", "when", "where", "which", "who", "whom",
+    "whose", "why", "will", "with", "would", "yet", "you", "your"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords, then strip a plural 's'.
+
+    Stopwords are checked on the word as written, so "this" is dropped rather
+    than stemmed to "thi"; "-ss", "-us" and "-is" endings are never plurals.
+    """
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Inverted index over short documents with vectorized BM25 scoring.
+
+    Postings are stored term-major in CSR layout (indptr / doc ids / weights)
+    and the BM25 weight of every posting is precomputed at build time, so a
+    query is scored with one bincount over the postings of its terms.
+    """
+
+    def __init__(self, documents: List[Tuple[str, str]], k1: float = 1.5, b: float = 0.75):
+        self.doc_ids = [doc_id for doc_id, _ in documents]
+        self.vocab: Dict[str, int] = {}
+        postings: Dict[int, Dict[int, int]] = {}
+        lengths = np.zeros(len(documents), dtype=np.float32)
+
+        for doc, (_, text) in enumerate(documents):
+            tokens = tokenize(text)
+            lengths[doc] = len(tokens)
+            for token in tokens:
+                term = self.vocab.setdefault(token, len(self.vocab))
+                counts = postings.setdefault(term, {})
+                counts[doc] = counts.get(doc, 0) + 1
+
+        n_docs = len(documents)
+        avgdl = float(lengths.mean()) if n_docs else 0.0
+        indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        indices, weights = [], []
+        for term in range(len(self.vocab)):
+            counts = postings[term]
+            indptr[term + 1] = indptr[term] + len(counts)
+            docs = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            idf = np.log(1.0 + (n_docs - len(counts) + 0.5) / (len(counts) + 0.5))
+            norm = k1 * (1.0 - b + b * lengths[docs] / avgdl)
+            indices.append(docs)
+            weights.append(idf * tf * (k1 + 1.0) / (tf + norm))
+
+        self.indptr = indptr
+        self.indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32)
+        self.weights = (np.concatenate(weights) if weights else np.zeros(0)).astype(np.float32)
+
+    @classmethod
+    def from_arrays(cls, doc_ids: List[str], vocab: Dict[str, int], indptr: np.ndarray,
+                    indices: np.ndarray, weights: np.ndarray) -> "BM25Index":
+        """Rebuild an index from precomputed arrays (e.g. memory-mapped from an artifact)"""
+        index = cls.__new__(cls)
+        index.doc_ids = doc_ids
+        index.vocab = vocab
+        index.indptr = indptr
+        index.indices = indices
+        index.weights = weights
+        return index
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def _postings(self, query: str) -> np.ndarray:
+        """Positions in indices/weights of every posting for the query's terms"""
+        terms = np.array([self.vocab[t] for t in set(tokenize(query)) if t in self.vocab], dtype=np.int64)
+        if not len(terms):
+            return np.zeros(0, dtype=np.int64)
+        starts = self.indptr[terms]
+        lengths = self.indptr[terms + 1] - starts
+        # Expand each [start, end) range without a Python loop per term
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every document for the query"""
+        rows = self._postings(query)
+        return np.bincount(self.indices[rows], weights=self.weights[rows], minlength=len(self.doc_ids))
+
+    def score_batch(self, queries: List[str]) -> np.ndarray:
+        """BM25 scores for several queries at once, shape (len(queries), documents)"""
+        n_docs = len(self.doc_ids)
+        rows = [self._postings(query) for query in queries]
+        owners = np.repeat(np.arange(len(queries), dtype=np.int64), [len(r) for r in rows])
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        flat = owners * n_docs + self.indices[rows]
+        scores = np.bincount(flat, weights=self.weights[rows], minlength=len(queries) * n_docs)
+        return scores.reshape(len(queries), n_docs)
+
+    def _top_k(self, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, score) pairs with a positive score, best first"""
+        if not self.doc_ids:
+            return []
+        return self._top_k(self.score(query), min(k, len(self.doc_ids)))
+
+    def search_batch(self, queries: List[str], k: int = 5, chunk_size: int = 256) -> List[List[Tuple[str, float]]]:
+        """search() for many queries, scored chunk by chunk in one vectorized pass each"""
+        if not self.doc_ids:
+            return [[] for _ in queries]
+        k = min(k, len(self.doc_ids))
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            for scores in self.score_batch(queries[start:start + chunk_size]):
+                results.append(self._top_k(scores, k))
+        return results
+
+
+def knowledge_documents(data: dict) -> List[Tuple[str, str]]:
+    """(doc_id, text) for every FAQ and location, in the order every index uses"""
+    documents = []
+    for key, text in data["faqs"].items():
+        documents.append((f"faq:{key}", f"{key.replace('_', ' ')} {text}"))
+    for key, text in data["locations"].items():
+        documents.append((f"location:{key}", f"{key.replace('_', ' ')} {text}"))
+    return documents
+
+
+def build_retriever(data: dict) -> BM25Index:
+    """Index every FAQ and location in the knowledge base"""
+    return BM25Index(knowledge_documents(data))
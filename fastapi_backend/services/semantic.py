@@ -0,0 +1,227 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.retrieval import BM25Index, knowledge_documents, tokenize
+
+NGRAM_SIZES = (3, 4, 5)
+_MULTIPLIER = np.uint64(1099511628211)  # FNV-1a 64-bit prime
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _ngram_rows(texts: List[str], dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(row, column) of every hashed character n-gram in the given texts.
+
+    All texts are concatenated into one byte array and every n-gram is hashed
+    with vectorized polynomial arithmetic, so there is no Python loop per n-gram.
+    Hashes are deterministic (unlike hash()), which keeps artifacts portable.
+    """
+    padded = [f" {' '.join(tokenize(text))} ".encode("utf-8") for text in texts]
+    lengths = np.fromiter((len(p) for p in padded), dtype=np.int64, count=len(padded))
+    data = np.frombuffer(b"".join(padded), dtype=np.uint8).astype(np.uint64)
+    owners = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+    rows, cols = [], []
+    with np.errstate(over="ignore"):
+        for n in NGRAM_SIZES:
+            if len(data) < n:
+                continue
+            count = len(data) - n + 1
+            h = np.full(count, np.uint64(n), dtype=np.uint64)
+            for offset in range(n):
+                h = h * _MULTIPLIER + data[offset:offset + count]
+            h ^= h >> np.uint64(29)
+            h *= _MIX
+            h ^= h >> np.uint64(32)
+            # Drop n-grams that straddle two texts
+            inside = owners[:count] == owners[n - 1:n - 1 + count]
+            rows.append(owners[:count][inside])
+            cols.append((h[inside] % np.uint64(dim)).astype(np.int64))
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+def _counts(texts: List[str], dim: int) -> np.ndarray:
+    rows, cols = _ngram_rows(texts, dim)
+    counts = np.bincount(rows * dim + cols, minlength=len(texts) * dim)
+    return counts.reshape(len(texts), dim).astype(np.float32)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+class SemanticIndex:
+    """Dense vectors from hashed character n-grams, searched by cosine similarity.
+
+    Every document becomes a TF-IDF weighted bag of hashed 3-5 character
+    n-grams. The vectors live in one contiguous, L2-normalized float32 matrix,
+    so scoring a query is a single matrix-vector product. Character n-grams
+    share signal between "documents" and "document", or "submit" and
+    "submission", where whole-word keyword matching sees nothing in common.
+
+    Corpora of at least ann_min_docs documents also get an inverted-file
+    (IVF) index: documents are clustered around sqrt(n) centroids and a query
+    only scores the members of its `probes` closest clusters. The matrix is
+    then stored in cluster order, so each probed cluster is one contiguous
+    slice rather than a gather.
+    """
+
+    def __init__(self, documents: List[Tuple[str, str]], dim: int = 1024,
+                 ann_min_docs: int = 10000, chunk_size: int = 1024):
+        self.doc_ids = [doc_id for doc_id, _ in documents]
+        self.dim = dim
+        texts = [text for _, text in documents]
+        document_frequency = np.zeros(dim, dtype=np.float64)
+        chunks = []
+        for start in range(0, len(texts), chunk_size):
+            counts = _counts(texts[start:start + chunk_size], dim)
+            document_frequency += (counts > 0).sum(axis=0)
+            chunks.append(counts)
+        self.idf = (np.log((1.0 + len(texts)) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+        matrix = np.concatenate(chunks) if chunks else np.zeros((0, dim), dtype=np.float32)
+        self.matrix = _normalize(np.sqrt(matrix) * self.idf)
+        # IVF index: centroids, cluster boundaries in matrix rows, and the document of each row
+        self.centroids: Optional[np.ndarray] = None
+        self.list_indptr: Optional[np.ndarray] = None
+        self.row_docs: Optional[np.ndarray] = None
+        self.doc_rows: Optional[np.ndarray] = None
+        if len(self.doc_ids) >= ann_min_docs:
+            self._build_ann()
+
+    @classmethod
+    def from_arrays(cls, doc_ids: List[str], arrays: Dict[str, np.ndarray]) -> "SemanticIndex":
+        """Rebuild an index from precomputed arrays (e.g. memory-mapped from an artifact)"""
+        index = cls.__new__(cls)
+        index.doc_ids = doc_ids
+        index.matrix = arrays["matrix"]
+        index.idf = arrays["idf"]
+        index.dim = index.matrix.shape[1]
+        index.centroids = arrays.get("centroids")
+        index.list_indptr = arrays.get("list_indptr")
+        index.row_docs = arrays.get("row_docs")
+        index.doc_rows = np.argsort(index.row_docs) if index.row_docs is not None else None
+        return index
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {"matrix": self.matrix, "idf": self.idf}
+        if self.centroids is not None:
+            arrays.update(centroids=self.centroids, list_indptr=self.list_indptr, row_docs=self.row_docs)
+        return arrays
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def _build_ann(self, iterations: int = 6, seed: int = 0):
+        """Spherical k-means over the document vectors, then reorder the matrix by cluster"""
+        n_lists = max(1, int(np.sqrt(len(self.doc_ids))))
+        rng = np.random.default_rng(seed)
+        centroids = self.matrix[rng.choice(len(self.doc_ids), n_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = self._nearest_centroid(centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, self.matrix)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        assignment = self._nearest_centroid(centroids)
+        order = np.argsort(assignment, kind="stable")
+        self.centroids = centroids
+        self.list_indptr = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        self.matrix = np.ascontiguousarray(self.matrix[order])
+        self.row_docs = order.astype(np.int32)
+        self.doc_rows = np.argsort(self.row_docs)
+
+    def _nearest_centroid(self, centroids: np.ndarray, chunk_size: int = 4096) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(self.matrix[start:start + chunk_size] @ centroids.T, axis=1)
+            for start in range(0, len(self.doc_ids), chunk_size)
+        ])
+
+    def encode(self, queries: List[str]) -> np.ndarray:
+        """Normalized query vectors, shape (len(queries), dim)"""
+        return _normalize(np.sqrt(_counts(queries, self.dim)) * self.idf)
+
+    def score_batch(self, queries: List[str]) -> np.ndarray:
+        """Exact cosine similarity of every document to each query, shape (queries, documents)"""
+        scores = self.encode(queries) @ self.matrix.T
+        return scores if self.doc_rows is None else scores[:, self.doc_rows]
+
+    def _probe(self, vector: np.ndarray, probes: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(documents, cosine) for every member of the probes clusters closest to vector"""
+        closest = np.argsort(-(self.centroids @ vector))[:probes]
+        bounds = [(self.list_indptr[c], self.list_indptr[c + 1]) for c in closest]
+        docs = np.concatenate([self.row_docs[a:b] for a, b in bounds])
+        scores = np.concatenate([self.matrix[a:b] @ vector for a, b in bounds])
+        return docs, scores
+
+    def _top_k(self, scores: np.ndarray, k: int, docs: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if docs is not None:
+            return [(self.doc_ids[docs[i]], float(scores[i])) for i in top if scores[i] > 0]
+        return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def search(self, query: str, k: int = 5, probes: int = 8) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, cosine) pairs, approximate when the IVF index exists"""
+        return self.search_batch([query], k, probes)[0]
+
+    def search_batch(self, queries: List[str], k: int = 5, probes: int = 8,
+                     chunk_size: int = 256) -> List[List[Tuple[str, float]]]:
+        """search() for many queries, one matrix product per chunk of queries"""
+        if not self.doc_ids:
+            return [[] for _ in queries]
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            vectors = self.encode(queries[start:start + chunk_size])
+            if self.centroids is None:
+                for scores in vectors @ self.matrix.T:
+                    results.append(self._top_k(scores, k))
+                continue
+            for vector in vectors:
+                docs, scores = self._probe(vector, probes)
+                results.append(self._top_k(scores, k, docs))
+        return results
+
+    def search_hybrid_batch(self, queries: List[str], keyword: BM25Index, k: int = 5, weight: float = 0.5,
+                            keyword_scale: float = 2.0, probes: int = 8,
+                            chunk_size: int = 256) -> List[List[Tuple[str, float]]]:
+        """Rank by weight * cosine + (1 - weight) * squashed BM25 score.
+
+        BM25 scores are mapped to [0, 1) with s / (s + keyword_scale), so a
+        document at the keyword threshold contributes half its weight. Both
+        indexes must hold the same documents in the same order. With the IVF
+        index, documents outside the probed clusters still compete through
+        their keyword score.
+        """
+        if not self.doc_ids:
+            return [[] for _ in queries]
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            keyword_scores = keyword.score_batch(chunk)
+            keyword_scores = (keyword_scores / (keyword_scores + keyword_scale)).astype(np.float32)
+            vectors = self.encode(chunk)
+            if self.centroids is None:
+                blended = weight * (vectors @ self.matrix.T) + (1.0 - weight) * keyword_scores
+                for scores in blended:
+                    results.append(self._top_k(scores, k))
+                continue
+            for vector, keyword_row in zip(vectors, keyword_scores):
+                docs, cosine = self._probe(vector, probes)
+                extra = np.setdiff1d(np.flatnonzero(keyword_row), docs)
+                docs = np.concatenate([docs, extra])
+                cosine = np.concatenate([cosine, self.matrix[self.doc_rows[extra]] @ vector])
+                blended = weight * cosine + (1.0 - weight) * keyword_row[docs]
+                results.append(self._top_k(blended, k, docs))
+        return results
+
+
+def build_semantic_index(data: dict, dim: int = 1024, ann_min_docs: int = 10000) -> SemanticIndex:
+    """Vectorize every FAQ and location, in the same document order as the BM25 index"""
+    return SemanticIndex(knowledge_documents(data), dim=dim, ann_min_docs=ann_min_docs)
@@ -0,0 +1,40 @@
+import asyncio
+import os
+import signal
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.matcher_pool import MatcherPool, PoolBrokenError
+
+KB = SimpleNamespace(version=None)
+
+
+def resolve(campus, version):
+    return None
+
+
+def worker_pid(kb=None):
+    return os.getpid()
+
+
+def test_pool_recovers_after_idle_worker_is_killed():
+    pool = MatcherPool("process", workers=1, queue_size=1, resolver="tests.test_matcher_pool:resolve")
+
+    async def scenario():
+        pid = await pool.run(worker_pid, "futo", KB, timeout=30)
+        os.kill(pid, signal.SIGKILL)
+        # Let the pool notice the dead worker while it is idle
+        time.sleep(0.5)
+        with pytest.raises(PoolBrokenError):
+            await pool.run(worker_pid, "futo", KB, timeout=30)
+        return pid, await pool.run(worker_pid, "futo", KB, timeout=30)
+
+    pool.start()
+    try:
+        old_pid, new_pid = asyncio.run(scenario())
+    finally:
+        pool.close()
+    assert new_pid != old_pid
+    assert pool.stats()["restarts"] == 1
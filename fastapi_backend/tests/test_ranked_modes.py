@@ -0,0 +1,25 @@
+import pytest
+
+from routers.chat import knowledge, ranked_answer, ranked_search
+
+def answer(question, mode):
+    kb = knowledge.current
+    return ranked_answer(ranked_search([question], kb, mode)[0], kb, mode)
+
+
+@pytest.mark.parametrize("mode", ["semantic", "hybrid"])
+def test_paraphrase_is_answered(mode):
+    result = answer("where do I submit my documents", mode)
+    assert result["match_path"] == mode
+    assert result["category"] == "clearance"
+
+
+@pytest.mark.parametrize("mode", ["semantic", "hybrid"])
+@pytest.mark.parametrize("question", [
+    "who won the football match",
+    "can I bring my car",
+    "is there a gym on campus",  # one keyword ("campus") in common with the library entry
+    "what time is it",
+])
+def test_off_topic_falls_back(mode, question):
+    assert answer(question, mode)["match_path"] == "fallback"
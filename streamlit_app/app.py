@@ -1,7 +1,10 @@
 import streamlit as st
 import requests
 import json
+import uuid
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Page config
 st.set_page_config(
@@ -46,6 +49,54 @@ st.markdown("""
 # API endpoint
 API_URL = "https://hackathon-project-5.onrender.com"
 
+@st.cache_resource
+def get_session():
+    """One keep-alive HTTP session to the backend, shared across reruns and users"""
+    session = requests.Session()
+    retries = Retry(
+        total=3,
+        connect=3,
+        read=2,
+        status=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"})  # only connection errors are retried for POSTs
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_tips():
+    """Quick tips only change with the knowledge base, so don't refetch them on every rerun"""
+    response = get_session().get(f"{API_URL}/chat/tips", timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_categories():
+    response = get_session().get(f"{API_URL}/chat/categories", timeout=5)
+    response.raise_for_status()
+    return response.json().get("categories", [])
+
+def stream_answer(request_data, reply):
+    """Yield answer chunks from /chat/ask/stream; related topics and metadata are stored in reply"""
+    with get_session().post(f"{API_URL}/chat/ask/stream", json=request_data, stream=True, timeout=10) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):])
+                if event == "answer":
+                    yield data["text"]
+                elif event == "related":
+                    reply["related"] = data["related_topics"]
+                elif event == "meta":
+                    reply.update(data)
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -53,6 +104,11 @@ if "messages" not in st.session_state:
 if "conversation_id" not in st.session_state:
     st.session_state.conversation_id = None
 
+# Stable per browser session, so the API rate limits each visitor separately
+# instead of everyone behind this app sharing its server's address
+if "user_id" not in st.session_state:
+    st.session_state.user_id = f"streamlit-{uuid.uuid4()}"
+
 # Title and description
 st.markdown('<h1 class="main-header">🎓 CampusAI Assistant</h1>', unsafe_allow_html=True)
 st.markdown('<p class="sub-header">Your AI-powered guide for freshers on campus</p>', unsafe_allow_html=True)
@@ -79,16 +135,22 @@ with st.sidebar:
     st.header("💡 Quick Tips")
     with st.expander("View Tips"):
         try:
-            tips_response = requests.get(f"{API_URL}/chat/tips", timeout=5)
-            if tips_response.status_code == 200:
-                tips_data = tips_response.json()
-                for i, tip in enumerate(tips_data.get("tips", [])[:5], 1):
-                    st.write(f"{i}. {tip}")
+            tips_data = fetch_tips()
+            for i, tip in enumerate(tips_data.get("tips", [])[:5], 1):
+                st.write(f"{i}. {tip}")
         except:
             st.write("• Check your Gmail daily")
             st.write("• Join your dept group chat")
             st.write("• Save your MSRC contact")
     
+    # Topics the assistant knows about
+    with st.expander("View Topics"):
+        try:
+            categories = fetch_categories()
+            st.write(", ".join(category.replace("_", " ") for category in categories))
+        except:
+            st.write("Fees, clearance, timetable, group chat, MSRC and more")
+    
     st.markdown("---")
     
     # System status
@@ -96,7 +158,7 @@ with st.sidebar:
     if st.button("Check Status", use_container_width=True):
         with st.spinner("Checking..."):
             try:
-                health = requests.get(f"{API_URL}/health", timeout=5)
+                health = get_session().get(f"{API_URL}/health", timeout=5)
                 if health.status_code == 200:
                     data = health.json()
                     st.success("✅ System Online")
@@ -163,37 +225,31 @@ if "pending_prompt" in st.session_state:
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Now trigger the same API request as below
+    # Now trigger the same API request as below, rendering the answer as it streams in
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                request_data = {"question": prompt}
-
-                if st.session_state.conversation_id:
-                    request_data["conversation_id"] = st.session_state.conversation_id
-
-                response = requests.post(f"{API_URL}/chat/ask", json=request_data, timeout=10)
+        try:
+            request_data = {"question": prompt, "user_id": st.session_state.user_id}
 
-                if response.status_code == 200:
-                    data = response.json()
-                    answer = data["answer"]
-                    related_topics = data.get("related_topics", [])
-                    conversation_id = data.get("conversation_id")
+            if st.session_state.conversation_id:
+                request_data["conversation_id"] = st.session_state.conversation_id
 
-                    if conversation_id:
-                        st.session_state.conversation_id = conversation_id
+            reply = {}
+            answer = st.write_stream(stream_answer(request_data, reply))
+            related_topics = reply.get("related", [])
+            conversation_id = reply.get("conversation_id")
 
-                    st.markdown(answer)
+            if conversation_id:
+                st.session_state.conversation_id = conversation_id
 
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": answer,
-                        "related": related_topics
-                    })
-                else:
-                    st.error("Error processing your question.")
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": answer,
+                "related": related_topics
+            })
+        except requests.exceptions.HTTPError:
+            st.error("Error processing your question.")
+        except Exception as e:
+            st.error(f"An error occurred: {str(e)}")
 
 st.markdown("---")
 
@@ -216,76 +272,67 @@ if prompt := st.chat_input("Ask about campus life... (e.g., 'What is MSRC?')"):
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Get AI response
+    # Get AI response, rendered incrementally as it streams in
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                # Prepare request
-                request_data = {
-                    "question": prompt
-                }
-                
-                # Add conversation_id if exists
-                if st.session_state.conversation_id:
-                    request_data["conversation_id"] = st.session_state.conversation_id
-                
-                # Make API call
-                response = requests.post(
-                    f"{API_URL}/chat/ask",
-                    json=request_data,
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    answer = data["answer"]
-                    source = data.get("source", "CampusAI")
-                    conversation_id = data.get("conversation_id")
-                    related_topics = data.get("related_topics", [])
-                    
-                    # Store conversation ID for follow-ups
-                    if conversation_id:
-                        st.session_state.conversation_id = conversation_id
-                    
-                    # Display answer
-                    st.markdown(answer)
-                    st.caption(f"📚 Source: {source}")
-                    
-                    # Show related topics
-                    if related_topics:
-                        st.caption(f"💡 Related topics: {', '.join(related_topics)}")
-                    
-                    # Add to history
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": answer,
-                        "related": related_topics
-                    })
-                else:
-                    error_msg = "Sorry, I couldn't process that question. Please try again."
-                    st.error(error_msg)
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": error_msg,
-                        "related": []
-                    })
-                    
-            except requests.exceptions.ConnectionError:
-                error_msg = "❌ Cannot connect to the backend server. Make sure the FastAPI server is running on port 8000."
-                st.error(error_msg)
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": error_msg,
-                    "related": []
-                })
-            except Exception as e:
-                error_msg = f"An error occurred: {str(e)}"
-                st.error(error_msg)
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": error_msg,
-                    "related": []
-                })
+        try:
+            # Prepare request
+            request_data = {
+                "question": prompt,
+                "user_id": st.session_state.user_id
+            }
+            
+            # Add conversation_id if exists
+            if st.session_state.conversation_id:
+                request_data["conversation_id"] = st.session_state.conversation_id
+            
+            # Stream the answer
+            reply = {}
+            answer = st.write_stream(stream_answer(request_data, reply))
+            source = reply.get("source", "CampusAI")
+            conversation_id = reply.get("conversation_id")
+            related_topics = reply.get("related", [])
+            
+            # Store conversation ID for follow-ups
+            if conversation_id:
+                st.session_state.conversation_id = conversation_id
+            
+            st.caption(f"📚 Source: {source}")
+            
+            # Show related topics
+            if related_topics:
+                st.caption(f"💡 Related topics: {', '.join(related_topics)}")
+            
+            # Add to history
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": answer,
+                "related": related_topics
+            })
+            
+        except requests.exceptions.HTTPError:
+            error_msg = "Sorry, I couldn't process that question. Please try again."
+            st.error(error_msg)
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": error_msg,
+                "related": []
+            })
+        except requests.exceptions.ConnectionError:
+            error_msg = "❌ Cannot connect to the backend server. Make sure the FastAPI server is running on port 8000."
+            st.error(error_msg)
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": error_msg,
+                "related": []
+            })
+        except Exception as e:
+            error_msg = f"An error occurred: {str(e)}"
+            st.error(error_msg)
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": error_msg,
+                "related": []
+            })
 
 # Info section at bottom
 st.markdown("---")